@@ -5,7 +5,12 @@ import torch.nn as nn
 import torch.nn.functional as F
 from copy import copy
 from math import sqrt
+from types import MappingProxyType
 import random
+import sys
+import weakref
+
+import instrumentation
 
 c=1.0
 
@@ -42,8 +47,23 @@ t7inv= lambda x: flip(flip(x,0),1).t()
 tinvlist = [t0inv, t1inv, t2inv, t3inv, t4inv, t5inv, t6inv, t7inv]
 tinvlist_half=[t0inv, t1inv, t2inv, t3inv]
 
+# the same inverses on numpy arrays, for the no-autograd search
+t0inv_np= lambda x: x
+t1inv_np= lambda x: x[:,::-1]
+t2inv_np= lambda x: x[::-1,:]
+t3inv_np= lambda x: x[::-1,::-1]
+t4inv_np= lambda x: x.T
+t5inv_np= lambda x: x[::-1,:].T
+t6inv_np= lambda x: x[:,::-1].T
+t7inv_np= lambda x: x[::-1,::-1].T
+
+tinvlist_np = [t0inv_np, t1inv_np, t2inv_np, t3inv_np, t4inv_np, t5inv_np, t6inv_np, t7inv_np]
+tinvlist_np_half = [t0inv_np, t1inv_np, t2inv_np, t3inv_np]
+
 transformation_list = list(zip(tlist, tinvlist))
 transformation_list_half = list(zip(tlist_half, tinvlist_half))
+transformation_list_np = list(zip(tlist, tinvlist_np))
+transformation_list_np_half = list(zip(tlist_half, tinvlist_np_half))
 
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu") 
 device ='cpu'
@@ -71,21 +91,234 @@ def process_policy(policy, game):
     return available_moves, probs, v.squeeze().squeeze()
 
 
+def process_policy_numpy(policy, game):
+    # same as process_policy without autograd: priors come back as a float64
+    # array and the value as a float, extracted once per expansion
+    if game.size[0]==game.size[1]:
+        t, tinv = random.choice(transformation_list_np)
+    else:
+        t, tinv = random.choice(transformation_list_np_half)
+
+    frame=torch.tensor(t(game.state*game.player), dtype=torch.float, device=device)
+    with torch.no_grad():
+        prob, v = policy(frame.unsqueeze(0).unsqueeze(0))
+    prob = tinv(prob.cpu().numpy())
+
+    available_moves = game.available_moves()
+    probs = prob[game.state == 0].astype(np.float64)
+    return available_moves, probs, float(v)
+
+
+class Widening:
+    """
+    Progressive widening schedule for Node: a node visited N times has
+    children for its int(initial + factor * N**exponent) highest-prior moves,
+    the other moves are only expanded as N grows.
+    """
+
+    def __init__(self, initial=4, factor=1.0, exponent=0.5):
+        self.initial = initial
+        self.factor = factor
+        self.exponent = exponent
+
+    def width(self, N):
+        return int(self.initial + self.factor * N ** self.exponent)
+
+
+# bytes of one entry (hash, key and value pointers) of the mother's child dict
+CHILD_ENTRY_BYTES = 32
+# bytes of one slot of ChildStats (prior, N, V, U) and of the mother's child_nodes list
+CHILD_SLOT_BYTES = 4*8 + 8
+
+
+def node_bytes(node):
+    """
+    Estimated size of one node: the node and its game with their attribute
+    dicts, the board array, the statistics (floats or tensors, or a slot of
+    the ChildStats of its mother), and its key and entry in the child dict of
+    its mother. The array headers of ChildStats, a few hundred bytes per
+    expanded node, are not counted.
+    """
+    game = node.game
+    size = (sys.getsizeof(node) + sys.getsizeof(node.__dict__) +
+            sys.getsizeof(game) + sys.getsizeof(game.__dict__) + sys.getsizeof(game.state))
+    if isinstance(node, ArrayNode):
+        values = (node.nn_v,)
+        size += CHILD_SLOT_BYTES
+    else:
+        values = (node.prob, node.nn_v, node.U, node.V)
+    for value in values:
+        size += sys.getsizeof(value)
+        if torch.is_tensor(value):
+            size += value.element_size() * value.nelement()
+    if game.last_move is not None:
+        # last_move of the game and the action key in the mother's child dict
+        move_bytes = sys.getsizeof(game.last_move) + sum(sys.getsizeof(x) for x in game.last_move)
+        size += 2 * move_bytes + CHILD_ENTRY_BYTES
+    return size
+
+
+# every TreeBudget whose tree is still alive, see tree_memory()
+live_budgets = weakref.WeakSet()
+
+
+class TreeBudget:
+    """
+    Node and/or byte budget shared by all nodes of one search tree.
+    Once it is exceeded, the least visited subtrees are collapsed back into
+    unexpanded leaves, which keep their N and V, until usage drops below
+    low_water times the budget.
+    Without limits it only keeps count of the nodes and estimated bytes of
+    the tree, as they are created and freed.
+    """
+
+    def __init__(self, max_nodes=None, max_bytes=None, low_water=0.75):
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.nodes = 0
+        self.bytes = 0
+        self.peak_bytes = 0
+        # number of subtrees collapsed so far
+        self.collapsed = 0
+        # estimated size of a node with a mother, see add()
+        self.child_bytes = None
+        live_budgets.add(self)
+
+    def add(self, node):
+        # all nodes below the root have the same layout, so node_bytes
+        # (a few dozen getsizeof calls) only runs once per tree for them
+        if node.mother is None:
+            node.nbytes = node_bytes(node)
+        else:
+            if self.child_bytes is None:
+                self.child_bytes = node_bytes(node)
+            node.nbytes = self.child_bytes
+        self.nodes += 1
+        self.bytes += node.nbytes
+        if self.bytes > self.peak_bytes:
+            self.peak_bytes = self.bytes
+
+    def remove(self, node):
+        self.nodes -= 1
+        self.bytes -= node.nbytes
+
+    def exceeded(self, fraction=1.0):
+        return (self.max_nodes is not None and self.nodes > fraction*self.max_nodes) or \
+               (self.max_bytes is not None and self.bytes > fraction*self.max_bytes)
+
+    def prune(self, root):
+        # expanded nodes below the root, parents before children
+        expanded = []
+        stack = list(root.child.values())
+        while stack:
+            node = stack.pop()
+            if node.child:
+                expanded.append(node)
+                stack.extend(node.child.values())
+
+        # a stable sort keeps a parent before a child with the same N
+        expanded.sort(key=lambda node: node.N)
+        for node in expanded:
+            if not self.exceeded(self.low_water):
+                break
+            # skip nodes that went away with a collapsed ancestor
+            if node.child:
+                self.collapse(node)
+
+    def collapse(self, node):
+        stack = list(node.child.values())
+        node.drop_children()
+        while stack:
+            removed = stack.pop()
+            stack.extend(removed.child.values())
+            self.remove(removed)
+            # break the mother <-> child cycles so the memory is freed right away
+            removed.drop_children()
+            removed.mother = None
+        self.collapsed += 1
+
+    def recount(self, root):
+        # start over from the nodes still reachable from root, after the rest of the tree was dropped
+        self.nodes = 0
+        self.bytes = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.child.values())
+            self.nodes += 1
+            self.bytes += node.nbytes
+
+    def split(self, root):
+        # move the subtree of root to a budget of its own, with the same limits
+        budget = TreeBudget(self.max_nodes, self.max_bytes, self.low_water)
+        budget.child_bytes = self.child_bytes
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.child.values())
+            self.remove(node)
+            node.budget = budget
+            budget.nodes += 1
+            budget.bytes += node.nbytes
+        budget.peak_bytes = budget.bytes
+        return budget
+
+    def usage(self):
+        return {
+            "nodes": self.nodes,
+            "bytes": self.bytes,
+            "peak_bytes": self.peak_bytes,
+            "bytes_per_node": self.bytes / self.nodes if self.nodes else 0.0,
+            "collapsed": self.collapsed,
+        }
+
+
+def tree_memory():
+    # search trees alive in this process (not yet garbage collected), with their nodes and bytes
+    budgets = list(live_budgets)
+    return {
+        "trees": len(budgets),
+        "nodes": sum(b.nodes for b in budgets),
+        "bytes": sum(b.bytes for b in budgets),
+    }
+
+
 class Node:
-    def __init__(self, game, mother=None, prob=torch.tensor(0., dtype=torch.float)):
+    def __new__(cls, game=None, mother=None, prob=None, widening=None, budget=None, autograd=True):
+        # Node(..., autograd=False) and the children of its tree are ArrayNodes
+        if cls is Node and not (mother.autograd if mother is not None else autograd):
+            cls = ArrayNode
+        return super().__new__(cls)
+
+    def __init__(self, game, mother=None, prob=None, widening=None, budget=None, autograd=True):
         self.game = game
           
         # child nodes
         self.child = {}
+        # (action, prob) of the moves not expanded yet, by decreasing prob,
+        # only used with progressive widening
+        self.pending = []
+        # children inherit the widening schedule of the root (None: expand every move)
+        self.widening = mother.widening if mother is not None else widening
+        # and its memory budget (None: unlimited)
+        self.budget = mother.budget if mother is not None else budget
+        # autograd=True keeps the torch tensors of the policy in the tree so that
+        # the training notebook can back-propagate through the search.
+        # autograd=False (for serving) builds an ArrayNode instead, see below
+        self.autograd = mother.autograd if mother is not None else autograd
         # numbers for determining which actions to take next
         self.U = 0
 
         # V from neural net output
         # it's a torch.tensor object
         # has require_grad enabled
+        # (a python float when autograd is off)
+        if prob is None:
+            prob = torch.tensor(0., dtype=torch.float) if self.autograd else 0.0
         self.prob = prob
         # the predicted expectation from neural net
-        self.nn_v = torch.tensor(0., dtype=torch.float)
+        self.nn_v = torch.tensor(0., dtype=torch.float) if self.autograd else 0.0
         
         # visit count
         self.N = 0
@@ -109,7 +342,18 @@ class Node:
         # link to previous node
         self.mother = mother
 
+        if self.budget is not None:
+            self.budget.add(self)
+
     def create_child(self, actions, probs):
+        # with progressive widening, only the most likely moves become children for now
+        if self.widening is not None:
+            order = sorted(range(len(actions)), key=lambda k: -float(probs[k]))
+            self.pending = [ (tuple(actions[k]), probs[k]) for k in order ]
+            self.child = {}
+            self.widen(self.widening.width(self.N))
+            return
+
         # create a dictionary of children
         games = [ copy(self.game) for a in actions ]
 
@@ -118,6 +362,29 @@ class Node:
 
         child = { tuple(a):Node(g, self, p) for a,g,p in zip(actions, games, probs) }
         self.child = child
+
+    def add_child(self, action, prob):
+        # one more child of an expanded node, for a move that was pending
+        game = copy(self.game)
+        game.move(action)
+        node = type(self)(game, self, prob)
+        self.child[action] = node
+        return node
+
+    def drop_children(self):
+        # back to an unexpanded leaf, N and V are kept
+        self.child = {}
+        self.pending = []
+
+    def widen(self, width):
+        # expand pending moves until there are `width` children (at least one more)
+        count = max(1, width - len(self.child))
+        added, self.pending = self.pending[:count], self.pending[count:]
+        for action, p in added:
+            node = self.add_child(action, p)
+            # give the new child the U its siblings got in the last backup
+            if node.U != float("inf") and node.U != -float("inf"):
+                node.U = c*float(p)*sqrt(self.N)
         
     def explore(self, policy):
 
@@ -125,13 +392,30 @@ class Node:
             raise ValueError("game has ended with score {0:d}".format(self.game.score))
 
         current = self
+        # per-phase timing, see instrumentation.py
+        timer = instrumentation.ExploreTimer() if instrumentation.enabled else None
 
         # explore children of the node
         # to speed things up 
         while current.child and current.outcome is None:
 
+            # progressive widening: more moves become children as N grows
+            if current.pending and len(current.child) < current.widening.width(current.N):
+                widened = len(current.child)
+                current.widen(current.widening.width(current.N))
+                if timer:
+                    timer.nodes += len(current.child) - widened
+
             child = current.child
             max_U = max(c.U for c in child.values())
+
+            # every child loses, but some moves are not expanded yet
+            if max_U == -float("inf") and current.pending:
+                current.widen(len(child) + 1)
+                if timer:
+                    timer.nodes += 1
+                continue
+
             #print("current max_U ", max_U) 
             actions = [ a for a,c in child.items() if c.U == max_U ]
             if len(actions) == 0:
@@ -151,15 +435,30 @@ class Node:
                 break
                 
             current = child[action]
+            if timer:
+                timer.depth += 1
+
+        if timer:
+            timer.mark('selection')
         
         # if node hasn't been expanded
         if not current.child and current.outcome is None:
             # policy outputs results from the perspective of the next player
             # thus extra - sign is needed
-            next_actions, probs, v = process_policy(policy, current.game)
+            if current.autograd:
+                next_actions, probs, v = process_policy(policy, current.game)
+            else:
+                next_actions, probs, v = process_policy_numpy(policy, current.game)
+            if timer:
+                timer.mark('policy')
             current.nn_v = -v
             current.create_child(next_actions, probs)
-            current.V = -float(v)
+            if timer:
+                timer.nodes += len(current.child)
+                timer.mark('create_child')
+            # a leaf collapsed by TreeBudget keeps the V of its old subtree
+            if current.N == 0:
+                current.V = -float(v)
 
         current.N += 1
 
@@ -177,6 +476,18 @@ class Node:
 
             current = current.mother
 
+        if timer:
+            timer.mark('backup')
+
+        # current is the root of the tree now
+        if current.budget is not None and current.budget.exceeded():
+            current.budget.prune(current)
+            if timer:
+                timer.mark('prune')
+
+        if timer:
+            timer.finish()
+
     def next(self, temperature=1.0):
 
         if self.game.score is not None:
@@ -185,7 +496,7 @@ class Node:
         if not self.child:
             print(self.game.state)
             raise ValueError('no children found and game hasn\'t ended')
-        
+
         child=self.child
         
         # if there are winning moves, just output those
@@ -218,3 +529,375 @@ class Node:
     def detach_mother(self):
         del self.mother
         self.mother = None
+        if self.budget is not None:
+            self.budget.recount(self)
+
+    def detach_subtree(self):
+        # move the subtree of this node to a new root, returned, that can be searched
+        # while the rest of the tree (still referenced) is read: this node stays in the
+        # tree as an unexpanded leaf with its N and V, the new root gets a budget of its own
+        root = object.__new__(type(self))
+        root.__dict__.update(self.__dict__)
+        root.mother = None
+        for child in root.child.values():
+            child.mother = root
+        self.drop_children()
+        if self.budget is not None:
+            self.budget.split(root)
+            # split took the count of root, which is this node, out of the tree's budget
+            self.budget.nodes += 1
+            self.budget.bytes += self.nbytes
+        return root
+
+
+# children of an unexpanded ArrayNode, shared and read-only
+NO_CHILDREN = MappingProxyType({})
+
+
+class ChildStats:
+    """
+    Statistics of the children of one ArrayNode, one slot per child in the
+    order of its child dict: the prior from the policy, the visit count N,
+    the value V and the selection score U.
+    """
+    __slots__ = ('prior', 'N', 'V', 'U')
+
+    def __init__(self, prior):
+        self.prior = np.array(prior, dtype=np.float64)
+        # float64 visit counts, so that U is computed without conversions
+        self.N = np.zeros(len(self.prior))
+        self.V = np.zeros(len(self.prior))
+        self.U = np.zeros(len(self.prior))
+
+    def __len__(self):
+        return len(self.prior)
+
+    def grow(self, prior):
+        # one more slot, for a child added by progressive widening
+        self.prior = np.append(self.prior, prior)
+        self.N = np.append(self.N, 0.0)
+        self.V = np.append(self.V, 0.0)
+        self.U = np.append(self.U, 0.0)
+
+    def copy_slot(self, index):
+        # ChildStats of one child alone, for a node detached from its mother
+        stats = ChildStats(self.prior[index:index+1])
+        stats.N[0], stats.V[0], stats.U[0] = self.N[index], self.V[index], self.U[index]
+        return stats
+
+
+class ArrayNode(Node):
+    """
+    Node of the no-autograd search, built by Node(..., autograd=False).
+
+    The prior, N, V and U of the children of a node are kept in the NumPy
+    arrays of its child_stats rather than on every child: selection is an
+    argmax over child_stats.U and the backup updates U of all the children
+    of a node in one step. A node finds its own statistics in the
+    child_stats of its mother (stats, at index); a root has a ChildStats of
+    its own. N, V, U and prob read and write that slot, so the rest of the
+    code uses both kinds of nodes alike.
+    """
+
+    def __init__(self, game, mother=None, prob=None, widening=None, budget=None, autograd=False):
+        self.game = game
+        self.child = NO_CHILDREN
+        self.pending = ()
+        self.widening = mother.widening if mother is not None else widening
+        self.budget = mother.budget if mother is not None else budget
+        self.autograd = False
+        self.nn_v = 0.0
+        self.outcome = self.game.score
+        self.mother = mother
+
+        if mother is None:
+            self.stats = ChildStats([0.0 if prob is None else prob])
+            self.index = 0
+        else:
+            # the slot of this child, allocated by create_child or added here
+            self.stats = mother.child_stats
+            self.index = len(mother.child_nodes)
+            if self.index == len(self.stats):
+                self.stats.grow(prob)
+            mother.child_nodes.append(self)
+        # statistics of the children, once expanded
+        self.child_stats = None
+        self.child_nodes = ()
+
+        if self.game.score is not None:
+            self.V = self.game.score*self.game.player
+            self.U = 0 if self.game.score == 0 else self.V*float('inf')
+
+        if self.budget is not None:
+            self.budget.add(self)
+
+    @property
+    def N(self):
+        return int(self.stats.N[self.index])
+
+    @N.setter
+    def N(self, value):
+        self.stats.N[self.index] = value
+
+    @property
+    def V(self):
+        return float(self.stats.V[self.index])
+
+    @V.setter
+    def V(self, value):
+        self.stats.V[self.index] = value
+
+    @property
+    def U(self):
+        return float(self.stats.U[self.index])
+
+    @U.setter
+    def U(self, value):
+        self.stats.U[self.index] = value
+
+    @property
+    def prob(self):
+        return float(self.stats.prior[self.index])
+
+    def create_child(self, actions, probs):
+        self.child = {}
+        self.child_nodes = []
+        if self.widening is not None:
+            order = sorted(range(len(actions)), key=lambda k: -probs[k])
+            self.pending = [ (tuple(actions[k]), probs[k]) for k in order ]
+            self.child_stats = ChildStats([])
+            self.widen(self.widening.width(self.N))
+            return
+
+        self.child_stats = ChildStats(probs)
+        for action in actions:
+            game = copy(self.game)
+            game.move(action)
+            self.child[tuple(action)] = ArrayNode(game, self)
+
+    def drop_children(self):
+        self.child = NO_CHILDREN
+        self.pending = ()
+        self.child_stats = None
+        self.child_nodes = ()
+
+    def explore(self, policy):
+        # Node.explore with the selection and the update of U done on child_stats
+
+        if self.game.score is not None:
+            raise ValueError("game has ended with score {0:d}".format(self.game.score))
+
+        current = self
+        # per-phase timing, see instrumentation.py
+        timer = instrumentation.ExploreTimer() if instrumentation.enabled else None
+
+        while current.child and current.outcome is None:
+
+            # progressive widening: more moves become children as N grows
+            if current.pending and len(current.child) < current.widening.width(current.N):
+                widened = len(current.child)
+                current.widen(current.widening.width(current.N))
+                if timer:
+                    timer.nodes += len(current.child) - widened
+
+            U = current.child_stats.U
+            max_U = U.max()
+
+            # every child loses, but some moves are not expanded yet
+            if max_U == -float("inf") and current.pending:
+                current.widen(len(current.child) + 1)
+                if timer:
+                    timer.nodes += 1
+                continue
+
+            # argmax, with ties broken at random
+            best = np.flatnonzero(U == max_U)
+            index = best[random.randrange(len(best))]
+
+            if max_U == -float("inf"):
+                current.U = float("inf")
+                current.V = 1.0
+                break
+
+            elif max_U == float("inf"):
+                current.U = -float("inf")
+                current.V = -1.0
+                break
+
+            current = current.child_nodes[index]
+            if timer:
+                timer.depth += 1
+
+        if timer:
+            timer.mark('selection')
+
+        # if node hasn't been expanded
+        if not current.child and current.outcome is None:
+            # policy outputs results from the perspective of the next player
+            # thus extra - sign is needed
+            next_actions, probs, v = process_policy_numpy(policy, current.game)
+            if timer:
+                timer.mark('policy')
+            current.nn_v = -v
+            current.create_child(next_actions, probs)
+            if timer:
+                timer.nodes += len(current.child)
+                timer.mark('create_child')
+            # a leaf collapsed by TreeBudget keeps the V of its old subtree
+            if current.N == 0:
+                current.V = -v
+
+        stats, index = current.stats, current.index
+        stats.N[index] += 1
+
+        # now update U and back-prop
+        while current.mother is not None:
+            mother = current.mother
+            value = stats.V[index]
+            stats, index = mother.stats, mother.index
+            stats.N[index] += 1
+            N = stats.N[index]
+            # between mother and child, the player is switched, extra - sign
+            stats.V[index] += (-value - stats.V[index])/N
+
+            # update U for all the children of mother, proven wins and losses keep theirs
+            children = mother.child_stats
+            np.copyto(children.U, children.V + c*children.prior*sqrt(N)/(1 + children.N),
+                      where=np.isfinite(children.U))
+
+            current = mother
+
+        if timer:
+            timer.mark('backup')
+
+        # current is the root of the tree now
+        if current.budget is not None and current.budget.exceeded():
+            current.budget.prune(current)
+            if timer:
+                timer.mark('prune')
+
+        if timer:
+            timer.finish()
+
+    def next(self, temperature=1.0):
+        # Node.next on child_stats, returns numpy arrays instead of tensors
+
+        if self.game.score is not None:
+            raise ValueError('game has ended with score {0:d}'.format(self.game.score))
+
+        if not self.child:
+            print(self.game.state)
+            raise ValueError('no children found and game hasn\'t ended')
+
+        stats = self.child_stats
+        # if there are winning moves, just output those
+        if stats.U.max() == float("inf"):
+            prob = (stats.U == float("inf")).astype(np.float64)
+        else:
+            # divide things by maxN for numerical stability
+            prob = (stats.N/(stats.N.max()+1))**(1/temperature)
+
+        total = prob.sum()
+        prob = prob/total if total > 0 else np.full(len(stats), 1.0/len(stats))
+
+        nextstate = self.child_nodes[np.random.choice(len(stats), p=prob)]
+        # V was for the previous player making a move
+        # to convert to the current player we add - sign
+        return nextstate, (-self.V, -self.nn_v, prob, stats.prior.copy())
+
+    def detach_mother(self):
+        # keep the statistics of this node, not the arrays of all its siblings
+        self.stats, self.index = self.stats.copy_slot(self.index), 0
+        super().detach_mother()
+
+    def detach_subtree(self):
+        root = super().detach_subtree()
+        root.stats, root.index = self.stats.copy_slot(self.index), 0
+        return root
+
+
+def gumbel_search(root, policy, simulations, max_considered=16, c_visit=50.0, c_scale=1.0, check=None):
+    """
+    Gumbel root search ("Policy improvement by planning with Gumbel",
+    Danihelka et al. 2022), an alternative to calling explore/next that
+    plays well with a much smaller number of simulations.
+
+    The root moves are sampled without replacement with the Gumbel-top-k
+    trick, the budget is split between them by sequential halving and the
+    move with the best g + logit + sigma(Q) is picked. Below the root the
+    usual explore() is used.
+
+    Returns the chosen child and the improved policy over root.child
+    (softmax of logit + sigma(completed Q)), a training target like the
+    visit distribution returned by next() (a numpy array when root.autograd is off).
+
+    check, when given, is called with the number of simulations done before
+    every simulation and may raise to abort the search.
+    """
+    if root.game.score is not None:
+        raise ValueError('game has ended with score {0:d}'.format(root.game.score))
+
+    # expanding the root costs one simulation
+    if not root.child:
+        root.explore(policy)
+        simulations -= 1
+
+    children = list(root.child.values())
+    logits = np.log(np.array([float(c.prob) for c in children]) + 1e-12)
+
+    # a winning move needs no search
+    for child in children:
+        if child.U == float("inf"):
+            improved = np.array([1.0 if c is child else 0.0 for c in children])
+            if root.autograd:
+                improved = torch.tensor(improved, dtype=torch.float, device=device)
+            return child, improved
+
+    def sigma(q):
+        # monotone transform of Q in [-1, 1], scaled up as visit counts grow
+        max_N = max(c.N for c in children)
+        return (c_visit + max_N) * c_scale * (np.asarray(q) + 1) / 2
+
+    def q(child):
+        # children hold V from the perspective of the player to move at the root
+        return float(child.V)
+
+    gumbel = np.random.gumbel(size=len(children))
+    k = min(max_considered, len(children), max(1, simulations))
+    candidates = list(np.argsort(-(gumbel + logits))[:k])
+
+    phases = max(1, int(np.ceil(np.log2(k))))
+    used = 0
+    while len(candidates) > 1 and used < simulations:
+        # share what is left of the budget equally between the remaining phases
+        visits = max(1, (simulations - used) // (phases * len(candidates)))
+        phases = max(1, phases - 1)
+        for index in candidates:
+            child = children[index]
+            # finished games have an exact value and nothing to explore
+            if child.outcome is not None:
+                continue
+            for _ in range(visits):
+                if used >= simulations:
+                    break
+                if check is not None:
+                    check(used)
+                child.explore(policy)
+                used += 1
+
+        scores = [gumbel[i] + logits[i] + sigma(q(children[i])) for i in candidates]
+        order = np.argsort(scores)[::-1]
+        candidates = [candidates[i] for i in order[:max(1, (len(candidates) + 1) // 2)]]
+
+    scores = [gumbel[i] + logits[i] + sigma(q(children[i])) for i in candidates]
+    chosen = children[candidates[int(np.argmax(scores))]]
+
+    # unvisited moves are completed with the value of the root, except finished
+    # games, whose V is their exact outcome
+    v_mix = -float(root.V)
+    completed_q = [q(c) if c.N > 0 or c.outcome is not None else v_mix for c in children]
+    improved = np.exp(logits + sigma(completed_q) - np.max(logits + sigma(completed_q)))
+    improved = improved / improved.sum()
+    if root.autograd:
+        improved = torch.tensor(improved, dtype=torch.float, device=device)
+    return chosen, improved
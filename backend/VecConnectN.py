@@ -0,0 +1,109 @@
+# VecConnectN.py
+#
+# B games of ConnectN played in lockstep on one (B, w, h) array.
+# Every call to step() advances all games with one array of actions, so the
+# policy can be evaluated on the whole batch with a single forward pass.
+
+import numpy as np
+
+
+class VecConnectN:
+
+    def __init__(self, B, size, N):
+        self.B = B
+        self.size = size
+        self.w, self.h = size
+        self.N = N
+
+        # same constraint as ConnectN
+        if B < 1 or self.w < 0 or self.h < 0 or self.N < 2 or \
+           (self.N > self.w and self.N > self.h):
+            raise ValueError(
+                f'Game cannot initialize {B} games with a {self.w}x{self.h} grid, and winning condition {self.N} in a row'
+            )
+
+        self.state = np.zeros((B, self.w, self.h), dtype=np.int8)
+        self.player = np.ones(B, dtype=np.int8)
+        self.n_moves = np.zeros(B, dtype=np.int32)
+
+    def reset(self, mask=None):
+        # reset all games, or only those where mask is True
+        if mask is None:
+            mask = np.ones(self.B, dtype=bool)
+        self.state[mask] = 0
+        self.player[mask] = 1
+        self.n_moves[mask] = 0
+
+    def available_mask(self):
+        # (B, w, h) boolean array of the legal moves of every game
+        return self.state == 0
+
+    def observation(self):
+        # boards from the perspective of the player to move,
+        # shaped (B, 1, w, h) as expected by Policy
+        obs = self.state * self.player[:, None, None]
+        return obs[:, None, :, :].astype(np.float32)
+
+    def random_actions(self, rng=np.random):
+        # a uniformly random legal flat action for every game
+        legal = self.available_mask().reshape(self.B, -1)
+        noise = rng.random_sample(legal.shape) * legal
+        return noise.argmax(axis=1)
+
+    def step(self, actions):
+        """
+        Play one move in every game. actions holds one flat index
+        (i*h + j) per game. Finished games are reset automatically.
+
+        Returns (done, winner, legal_mask):
+          done:       (B,) bool, the game ended with this move
+          winner:     (B,) int8, 1 or -1 for the winning player, 0 for a draw
+                      or a game that is still running
+          legal_mask: (B, w, h) bool, legal moves for the next step, already
+                      reflecting the reset of finished games
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.B)
+        batch = np.arange(self.B)
+        i, j = np.divmod(actions, self.h)
+        if np.any((actions < 0) | (actions >= self.w * self.h)) or np.any(self.state[batch, i, j] != 0):
+            raise ValueError('illegal move in at least one game')
+
+        self.state[batch, i, j] = self.player
+        self.n_moves += 1
+
+        won = self.in_a_row(self.state == self.player[:, None, None])
+        full = self.n_moves == self.w * self.h
+        done = won | full
+        winner = np.where(won, self.player, 0).astype(np.int8)
+
+        # switch player for the games that go on, restart the others
+        self.player = np.where(done, self.player, -self.player).astype(np.int8)
+        self.reset(done)
+        return done, winner, self.available_mask()
+
+    def in_a_row(self, own):
+        # (B,) bool: does the (B, w, h) boolean board have N in a row anywhere
+        N, w, h = self.N, self.w, self.h
+        win = np.zeros(self.B, dtype=bool)
+
+        if h >= N:
+            run = np.ones((self.B, w, h - N + 1), dtype=bool)
+            for k in range(N):
+                run &= own[:, :, k:h - N + 1 + k]
+            win |= run.any(axis=(1, 2))
+
+        if w >= N:
+            run = np.ones((self.B, w - N + 1, h), dtype=bool)
+            for k in range(N):
+                run &= own[:, k:w - N + 1 + k, :]
+            win |= run.any(axis=(1, 2))
+
+        if w >= N and h >= N:
+            diag = np.ones((self.B, w - N + 1, h - N + 1), dtype=bool)
+            anti = np.ones((self.B, w - N + 1, h - N + 1), dtype=bool)
+            for k in range(N):
+                diag &= own[:, k:w - N + 1 + k, k:h - N + 1 + k]
+                anti &= own[:, k:w - N + 1 + k, N - 1 - k:h - k]
+            win |= diag.any(axis=(1, 2)) | anti.any(axis=(1, 2))
+
+        return win
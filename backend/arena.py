@@ -0,0 +1,84 @@
+# arena.py
+#
+# Matches between two players, to compare policies or search settings.
+# A player is a function game -> move, like Challenge_Player_MCTS in main.py.
+#
+#     python arena.py 6-6-4-new.policy 6-6-4-pie.policy --games 20 --simulations 200
+
+import argparse
+import random
+from copy import copy
+
+import torch
+
+import MCTS
+from ConnectN import ConnectN
+from policy import load_policy
+
+game_setting = {'size': (6,6), 'N':4}
+
+
+def mcts_player(policy, simulations=1000, temperature=0.1, widening=None):
+    # the search used by main.Challenge_Player_MCTS, with a configurable budget
+    def player(game):
+        mytree = MCTS.Node(copy(game), widening=widening, autograd=False)
+        with torch.no_grad():
+            for _ in range(simulations):
+                mytree.explore(policy)
+            mytreenext, _ = mytree.next(temperature=temperature)
+        return mytreenext.game.last_move
+    return player
+
+
+def gumbel_player(policy, simulations=128):
+    # main.Challenge_Player_MCTS with AI_SEARCH=gumbel
+    def player(game):
+        with torch.no_grad():
+            mytreenext, _ = MCTS.gumbel_search(MCTS.Node(copy(game), autograd=False), policy, simulations)
+        return mytreenext.game.last_move
+    return player
+
+
+def random_player(game):
+    return tuple(random.choice(game.available_moves()))
+
+
+def play_game(player1, player2, game_setting=game_setting):
+    # returns the score: 1 if player1 won, -1 if player2 won, 0 for a draw
+    game = ConnectN(**game_setting)
+    while game.score is None:
+        player = player1 if game.player == 1 else player2
+        game.move(player(game))
+    return game.score
+
+
+def play_match(player_a, player_b, games, game_setting=game_setting):
+    """
+    Play games between a and b, alternating who moves first.
+    Returns wins, losses and draws of a, and its score (win 1, draw 0.5).
+    """
+    result = {'wins': 0, 'losses': 0, 'draws': 0}
+    for k in range(games):
+        if k % 2 == 0:
+            score = play_game(player_a, player_b, game_setting)
+        else:
+            score = -play_game(player_b, player_a, game_setting)
+        result['wins' if score > 0 else 'losses' if score < 0 else 'draws'] += 1
+    result['score'] = (result['wins'] + 0.5 * result['draws']) / games
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play a match between two saved policies')
+    parser.add_argument('policy_a')
+    parser.add_argument('policy_b')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    a = mcts_player(load_policy(args.policy_a), args.simulations)
+    b = mcts_player(load_policy(args.policy_b), args.simulations)
+    print(play_match(a, b, args.games))
@@ -0,0 +1,9 @@
+# benchmarks
+#
+# Stand-alone benchmark scripts for the backend. Run them from the backend/
+# directory so the game modules and 6-6-4-pie.policy are found, e.g.
+#
+#     python -m benchmarks.bench_tree_export
+#
+# python -m benchmarks runs the suite of benchmarks/suite.py, which writes
+# JSON results and compares them against a stored baseline.
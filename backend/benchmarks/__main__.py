@@ -0,0 +1,52 @@
+# benchmarks/__main__.py
+#
+# Command line of the benchmark suite (benchmarks/suite.py):
+#
+#     python -m benchmarks --out results.json
+#     python -m benchmarks --only engine search --baseline baseline.json --threshold 0.15
+#     python -m benchmarks --save-baseline baseline.json
+#
+# With --baseline, the exit status is 1 when a metric regressed by more than
+# --threshold, so the suite can gate a CI job.
+
+import argparse
+import sys
+
+from benchmarks import suite
+from benchmarks.common import print_table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Backend benchmark suite')
+    parser.add_argument('--only', nargs='+', choices=suite.SUITES, default=list(suite.SUITES),
+                        help='suites to run')
+    parser.add_argument('--quick', action='store_true', help='fewer repetitions, for a smoke run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown that counts as a regression (default 0.1)')
+    parser.add_argument('--save-baseline', help='write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    report = suite.run(args.only, args.quick, args.seed)
+    print_table([{'metric': name, 'value': r['value'], 'unit': r['unit']}
+                 for name, r in sorted(report['results'].items())], ['metric', 'value', 'unit'])
+
+    if args.out:
+        suite.save(report, args.out)
+    if args.save_baseline:
+        suite.save(report, args.save_baseline)
+
+    if args.baseline:
+        rows = suite.compare(report, suite.load(args.baseline), args.threshold)
+        print()
+        print_table(rows, ['metric', 'baseline', 'current', 'change_pct', 'status'])
+        if any(r['status'] == 'REGRESSION' for r in rows):
+            print(f'\nregression beyond {args.threshold:.0%} against {args.baseline}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
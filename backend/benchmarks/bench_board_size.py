@@ -0,0 +1,62 @@
+# benchmarks/bench_board_size.py
+#
+# How far the search scales with the board: forward pass latency (one board
+# and a batch) and MCTS simulations per second of the fully connected Policy
+# and the fully convolutional ConvPolicy for growing ConnectN boards.
+# Networks are randomly initialized, only the cost is measured.
+#
+#     python -m benchmarks.bench_board_size --boards 6,6,4 8,8,5 9,9,5 12,12,5 15,15,5
+
+import argparse
+import time
+
+import torch
+
+import MCTS
+from ConnectN import ConnectN
+from policy import ConvPolicy, Policy
+from benchmarks.common import print_table, seed_everything, time_call
+
+
+def parse_board(text):
+    w, h, n = (int(x) for x in text.split(','))
+    return {'size': (w, h), 'N': n}
+
+
+def run(boards=('6,6,4', '8,8,5', '9,9,5', '12,12,5'), batch=64, simulations=200, seed=0):
+    torch.set_grad_enabled(False)
+    rows = []
+    for text in boards:
+        game_setting = parse_board(text)
+        w, h = game_setting['size']
+        for name, cls in (('policy', Policy), ('conv', ConvPolicy)):
+            seed_everything(seed)
+            game = ConnectN(**game_setting)
+            policy = cls(game)
+            one = torch.zeros(1, 1, w, h)
+            many = torch.zeros(batch, 1, w, h)
+            latency, _ = time_call(lambda: policy(one), repeat=50)
+            batch_latency, _ = time_call(lambda: policy(many), repeat=10)
+
+            mytree = MCTS.Node(game, autograd=False)
+            start = time.perf_counter()
+            for _ in range(simulations):
+                mytree.explore(policy)
+            seconds = time.perf_counter() - start
+
+            rows.append({'board': text, 'net': name,
+                         'params': sum(p.numel() for p in policy.parameters()),
+                         'forward_ms': latency * 1000, 'batch_ms': batch_latency * 1000,
+                         'boards_per_s': batch / batch_latency, 'sims_per_s': simulations / seconds})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Forward pass latency and simulations per second of Policy and ConvPolicy per board size')
+    parser.add_argument('--boards', nargs='+', default=['6,6,4', '8,8,5', '9,9,5', '12,12,5'],
+                        help='width,height,N of every board')
+    parser.add_argument('--batch', type=int, default=64)
+    parser.add_argument('--simulations', type=int, default=200)
+    args = parser.parse_args()
+    print_table(run(args.boards, args.batch, args.simulations),
+                ['board', 'net', 'params', 'forward_ms', 'batch_ms', 'boards_per_s', 'sims_per_s'])
@@ -0,0 +1,51 @@
+# benchmarks/bench_gumbel.py
+#
+# How many simulations does each root search need to match the current AI
+# (PUCT with 1000 simulations)? Both PUCT and Gumbel search are played at
+# increasing budgets against the reference; the first budget reaching a
+# score of about 0.5 is the one needed for equal results.
+#
+#     python -m benchmarks.bench_gumbel --budgets 16 32 64 128 256 --games 20
+
+import argparse
+import time
+
+import arena
+from benchmarks.common import load_app, print_table, seed_everything
+
+
+def timed(player):
+    # wrap a player to record its thinking time per move
+    times = []
+
+    def wrapped(game):
+        start = time.perf_counter()
+        move = player(game)
+        times.append(time.perf_counter() - start)
+        return move
+    return wrapped, times
+
+
+def run(budgets=(16, 32, 64, 128, 256), games=20, reference=1000, seed=0):
+    policy = load_app().challenge_policy
+    reference_player = arena.mcts_player(policy, reference)
+    rows = []
+    for search, make_player in (('puct', arena.mcts_player), ('gumbel', arena.gumbel_player)):
+        for budget in budgets:
+            seed_everything(seed)
+            player, times = timed(make_player(policy, budget))
+            result = arena.play_match(player, reference_player, games)
+            rows.append({'search': search, 'simulations': budget, 'vs_puct': reference,
+                         'score': result['score'], 'wins': result['wins'], 'draws': result['draws'],
+                         'losses': result['losses'], 'ms_per_move': 1000 * sum(times) / len(times)})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulations PUCT and Gumbel search need to match the current AI')
+    parser.add_argument('--budgets', type=int, nargs='+', default=[16, 32, 64, 128, 256])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--reference', type=int, default=1000, help='PUCT simulations of the reference player')
+    args = parser.parse_args()
+    print_table(run(args.budgets, args.games, args.reference),
+                ['search', 'simulations', 'vs_puct', 'score', 'wins', 'draws', 'losses', 'ms_per_move'])
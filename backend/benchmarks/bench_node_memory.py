@@ -0,0 +1,101 @@
+# benchmarks/bench_node_memory.py
+#
+# Per-node memory and simulations per second of one search in the three
+# ways MCTS.Node can be used:
+#   numpy     Node(..., autograd=False), an ArrayNode tree with numpy statistics
+#   no_grad   tensors under torch.no_grad(), how the server searched before
+#   autograd  tensors with the autograd graph kept, as in the training notebook
+#
+# tracemalloc only sees Python allocations, not tensor storage and autograd
+# graphs allocated by torch, so the growth of the resident set is reported too.
+# Every mode runs in a forked process, so that memory freed by one mode is
+# not reused by the next.
+#
+#     python -m benchmarks.bench_node_memory --simulations 2000
+
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import time
+import tracemalloc
+from contextlib import nullcontext
+from copy import copy
+
+import torch
+
+import MCTS
+from ConnectN import ConnectN
+from benchmarks.bench_widening import count_nodes
+from benchmarks.common import load_app, print_table, seed_everything
+
+MODES = ('numpy', 'no_grad', 'autograd')
+
+
+def rss_bytes():
+    # resident set size of this process, 0 where /proc is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+def search(policy, game, simulations, mode, seed):
+    seed_everything(seed)
+    mytree = MCTS.Node(copy(game), autograd=mode != 'numpy')
+    with torch.no_grad() if mode == 'no_grad' else nullcontext():
+        for _ in range(simulations):
+            mytree.explore(policy)
+        mytree.next(temperature=0.1)
+    return mytree
+
+
+def search_stats(policy, game, simulations, mode, seed=0):
+    gc.collect()
+    rss = rss_bytes()
+    start = time.perf_counter()
+    mytree = search(policy, game, simulations, mode, seed)
+    seconds = time.perf_counter() - start
+    rss = rss_bytes() - rss
+    nodes = count_nodes(mytree)
+    del mytree
+    gc.collect()
+
+    tracemalloc.start()
+    mytree = search(policy, game, simulations, mode, seed)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del mytree
+    gc.collect()
+
+    return {'mode': mode, 'nodes': nodes, 'sims_per_s': simulations / seconds,
+            'traced_b_per_node': traced / nodes, 'rss_b_per_node': max(rss, 0) / nodes}
+
+
+def forked_stats(policy, game, simulations, mode, seed):
+    ctx = mp.get_context('fork')
+    results = ctx.Queue()
+    process = ctx.Process(target=lambda: results.put(search_stats(policy, game, simulations, mode, seed)))
+    process.start()
+    stats = results.get()
+    process.join()
+    return stats
+
+
+def run(modes=MODES, simulations=2000, seed=0):
+    policy = load_app().challenge_policy
+    game = ConnectN(size=(6,6), N=4)
+    game.move((2, 2))
+    # the first search pays for torch warm-up, keep it out of the numbers
+    search(policy, game, 50, 'numpy', seed)
+    return [forked_stats(policy, game, simulations, mode, seed) for mode in modes]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per-node memory and simulations per second of the MCTS.Node modes')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--simulations', type=int, default=2000)
+    args = parser.parse_args()
+    print_table(run(args.modes, args.simulations),
+                ['mode', 'nodes', 'sims_per_s', 'traced_b_per_node', 'rss_b_per_node'])
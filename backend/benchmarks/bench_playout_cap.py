@@ -0,0 +1,79 @@
+# benchmarks/bench_playout_cap.py
+#
+# Playout cap randomization against full searches on every move: train a
+# policy from scratch with each self-play mode for the same wall-clock time,
+# then compare games played and the strength of the result, head to head
+# and against the challenge policy.
+#
+#     python -m benchmarks.bench_playout_cap --minutes 30 --simulations 400 --cheap 80
+
+import argparse
+import time
+
+import torch
+import torch.optim as optim
+
+import arena
+import train
+from ConnectN import ConnectN
+from benchmarks.common import GameWindow, load_app, print_table, seed_everything
+
+
+def train_for(seconds, simulations, cheap_simulations, full_fraction, seed=0, steps_per_game=4):
+    seed_everything(seed)
+    policy = train.Policy(ConnectN(**train.game_setting))
+    optimizer = optim.Adam(policy.parameters(), lr=.005, weight_decay=1.e-5)
+    window = GameWindow(200)
+    trainer = train.MinibatchTrainer(policy, optimizer, window, batch_size=64)
+    games = positions = policy_targets = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        with torch.no_grad():
+            records = train.self_play_game(policy, train.game_setting, simulations,
+                                           cheap_simulations, full_fraction)
+        window.add_game(records)
+        games += 1
+        positions += len(records)
+        policy_targets += sum(full for _, _, _, full in records)
+        for _ in range(steps_per_game):
+            if trainer.ready():
+                trainer.step()
+    hours = (time.perf_counter() - start) / 3600
+    return policy, {'games': games, 'games_per_hour': games / hours,
+                    'positions': positions, 'policy_targets': policy_targets}
+
+
+def run(minutes=10.0, simulations=400, cheap=80, fraction=0.25, match_games=20, match_simulations=200):
+    challenge = load_app().challenge_policy
+    full_policy, full_stats = train_for(minutes * 60, simulations, None, 1.0)
+    cap_policy, cap_stats = train_for(minutes * 60, simulations, cheap, fraction)
+
+    full_player = arena.mcts_player(full_policy, match_simulations)
+    cap_player = arena.mcts_player(cap_policy, match_simulations)
+    challenge_player = arena.mcts_player(challenge, match_simulations)
+
+    seed_everything(1)
+    head_to_head = arena.play_match(cap_player, full_player, match_games)
+    rows = []
+    for mode, stats, player in (('full', full_stats, full_player), ('playout_cap', cap_stats, cap_player)):
+        seed_everything(2)
+        vs_challenge = arena.play_match(player, challenge_player, match_games)
+        rows.append(dict(mode=mode, **stats, score_vs_challenge=vs_challenge['score']))
+    rows[1]['score_vs_full'] = head_to_head['score']
+    rows[0]['score_vs_full'] = '-'
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Playout cap randomization against full searches at the same training time')
+    parser.add_argument('--minutes', type=float, default=10.0, help='training time per mode')
+    parser.add_argument('--simulations', type=int, default=400)
+    parser.add_argument('--cheap', type=int, default=80)
+    parser.add_argument('--fraction', type=float, default=0.25)
+    parser.add_argument('--match-games', type=int, default=20)
+    parser.add_argument('--match-simulations', type=int, default=200)
+    args = parser.parse_args()
+    print_table(run(args.minutes, args.simulations, args.cheap, args.fraction,
+                    args.match_games, args.match_simulations),
+                ['mode', 'games', 'games_per_hour', 'positions', 'policy_targets',
+                 'score_vs_challenge', 'score_vs_full'])
@@ -0,0 +1,85 @@
+# benchmarks/bench_ponder.py
+#
+# Time-to-move of the AI with and without pondering (ponder.Ponderer).
+# The AI plays games against a cheap MCTS "human" who thinks for --think
+# seconds per move; with pondering the AI searches during that time and
+# starts its own search from the pondered subtree of the human's move.
+# Reported per setting: median and mean AI time-to-move, and the mean number
+# of pondered simulations the AI search started with.
+#
+#     python -m benchmarks.bench_ponder --think 0 1 3 --simulations 1000 --games 2
+
+import argparse
+import statistics
+import time
+from copy import copy
+
+import MCTS
+import arena
+from ConnectN import ConnectN
+from ponder import Ponderer
+from benchmarks.common import load_app, print_table, seed_everything
+
+
+def play(policy, simulations, think, ponder, human_simulations=50, seed=0):
+    # one game, the AI moves second like in the app; returns (time-to-move, reused simulations) per AI move
+    seed_everything(seed)
+    human = arena.mcts_player(policy, human_simulations)
+    ponderer = Ponderer(policy, max_simulations=20 * simulations) if ponder else None
+    game = ConnectN(size=(6,6), N=4)
+    moves = []
+    while game.score is None:
+        if ponderer is not None:
+            ponderer.pause()
+        move = human(game)
+        if ponderer is not None:
+            ponderer.resume()
+        time.sleep(think)
+        game.move(move)
+        if game.score is not None:
+            break
+
+        start = time.perf_counter()
+        mytree = ponderer.take(game) if ponderer is not None else None
+        if mytree is None:
+            mytree = MCTS.Node(copy(game), autograd=False)
+        reused = mytree.N
+        for _ in range(max(0, simulations - mytree.N)):
+            mytree.explore(policy)
+        mytreenext, _ = mytree.next(temperature=0.1)
+        moves.append((time.perf_counter() - start, reused))
+
+        game.move(mytreenext.game.last_move)
+        if ponderer is not None:
+            mytreenext.detach_mother()
+            ponderer.start(mytreenext)
+    if ponderer is not None:
+        ponderer.discard()
+    return moves
+
+
+def run(thinks=(0.0, 1.0, 3.0), simulations=1000, games=2, seed=0):
+    policy = load_app().challenge_policy
+    rows = []
+    for think in thinks:
+        for ponder in (False, True):
+            moves = []
+            for k in range(games):
+                moves += play(policy, simulations, think, ponder, seed=seed + k)
+            seconds = [s for s, _ in moves]
+            rows.append({'think_s': think, 'ponder': ponder, 'ai_moves': len(moves),
+                         'median_ms': statistics.median(seconds) * 1000,
+                         'mean_ms': statistics.mean(seconds) * 1000,
+                         'reused_sims': statistics.mean(r for _, r in moves)})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='AI time-to-move with and without pondering')
+    parser.add_argument('--think', type=float, nargs='+', default=[0.0, 1.0, 3.0],
+                        help='seconds the human takes per move')
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--games', type=int, default=2)
+    args = parser.parse_args()
+    print_table(run(args.think, args.simulations, args.games),
+                ['think_s', 'ponder', 'ai_moves', 'median_ms', 'mean_ms', 'reused_sims'])
@@ -0,0 +1,54 @@
+# benchmarks/bench_root_parallel.py
+#
+# Latency of one AI move at a fixed total simulation count when the search
+# is split over W processes (root_parallel.RootParallelSearch), and the
+# resulting simulations per wall-clock second. W=1 is the plain search.
+# Scaling stops at the number of physical cores.
+#
+#     python -m benchmarks.bench_root_parallel --workers 1 2 4 8 --simulations 2000
+
+import argparse
+import time
+from copy import copy
+
+import MCTS
+from ConnectN import ConnectN
+from root_parallel import RootParallelSearch
+from benchmarks.common import load_app, print_table, seed_everything
+
+
+def run(workers=(1, 2, 4), simulations=2000, repeat=3, seed=0):
+    policy = load_app().challenge_policy
+    game = ConnectN(size=(6,6), N=4)
+    game.move((2, 2))
+
+    rows = []
+    for W in workers:
+        search = RootParallelSearch(policy, workers=W, seed=seed)
+        try:
+            # the first move pays for starting the workers
+            search.search(MCTS.Node(copy(game), autograd=False), W)
+            seed_everything(seed)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                mytree = search.search(MCTS.Node(copy(game), autograd=False), simulations)
+                mytree.next(temperature=0.1)
+                timings.append(time.perf_counter() - start)
+        finally:
+            search.close()
+        best = max(mytree.child.items(), key=lambda item: item[1].N)
+        latency = sorted(timings)[len(timings) // 2]
+        rows.append({'workers': W, 'latency_ms': latency * 1000, 'sims_per_s': simulations / latency,
+                     'root_N': mytree.N, 'best_move': best[0], 'best_N': best[1].N})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='AI move latency of root-parallel search per number of processes')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--simulations', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print_table(run(args.workers, args.simulations, args.repeat),
+                ['workers', 'latency_ms', 'sims_per_s', 'root_N', 'best_move', 'best_N'])
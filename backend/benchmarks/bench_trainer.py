@@ -0,0 +1,112 @@
+# benchmarks/bench_trainer.py
+#
+# Training throughput and peak memory of the notebook's per-game approach
+# (search with autograd on, one loss.backward() per game over the graphs of
+# every move) against train.MinibatchTrainer (search under no_grad, detached
+# records, shuffled minibatches). Each mode runs in a fresh process so that
+# the peak RSS numbers do not mix.
+#
+#     python -m benchmarks.bench_trainer --games 4 --simulations 200
+
+import argparse
+import multiprocessing
+import resource
+import time
+
+import torch
+import torch.optim as optim
+
+import MCTS
+import train
+from ConnectN import ConnectN
+from benchmarks.common import GameWindow, print_table, seed_everything
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def per_game_graph(policy, optimizer, games, simulations):
+    # the training cell of alphazero-TicTacToe-advanced.ipynb
+    positions = 0
+    for _ in range(games):
+        mytree = MCTS.Node(ConnectN(**train.game_setting))
+        logterm = []
+        vterm = []
+        while mytree.outcome is None:
+            for _ in range(simulations):
+                mytree.explore(policy)
+                if mytree.N >= simulations:
+                    break
+            current_player = mytree.game.player
+            mytree, (v, nn_v, p, nn_p) = mytree.next()
+            mytree.detach_mother()
+            loglist = torch.log(nn_p)*p
+            constant = torch.where(p>0, p*torch.log(p),torch.tensor(0.))
+            logterm.append(-torch.sum(loglist-constant))
+            vterm.append(nn_v*current_player)
+            positions += 1
+        outcome = mytree.outcome
+        loss = torch.sum( (torch.stack(vterm)-outcome)**2 + torch.stack(logterm) )
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    return positions
+
+
+def minibatch(policy, optimizer, games, simulations, batch_size=32):
+    window = GameWindow(games)
+    for _ in range(games):
+        with torch.no_grad():
+            window.add_game(train.self_play_game(policy, train.game_setting, simulations))
+    # train on every position once, like the per-game approach does,
+    # in one smaller batch when the games made fewer positions than a batch
+    batch_size = min(batch_size, len(window))
+    trainer = train.MinibatchTrainer(policy, optimizer, window, batch_size)
+    for _ in range(len(window) // batch_size):
+        trainer.step()
+    return len(window), trainer.samples_per_second()
+
+
+def measure(mode, games, simulations, seed, results):
+    torch.set_num_threads(1)
+    seed_everything(seed)
+    policy = train.Policy(ConnectN(**train.game_setting))
+    optimizer = optim.Adam(policy.parameters(), lr=.005, weight_decay=1.e-5)
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    if mode == 'per_game_graph':
+        positions = per_game_graph(policy, optimizer, games, simulations)
+        train_samples_per_s = None
+    else:
+        positions, train_samples_per_s = minibatch(policy, optimizer, games, simulations)
+    seconds = time.perf_counter() - start
+    results.put({
+        'mode': mode,
+        'positions': positions,
+        'positions_per_s': positions / seconds,
+        'train_samples_per_s': train_samples_per_s or '-',
+        'peak_rss_mb': max_rss_mb(),
+        'rss_growth_mb': max_rss_mb() - rss_before,
+    })
+
+
+def run(games=4, simulations=200, seed=0):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    rows = []
+    for mode in ('per_game_graph', 'minibatch'):
+        process = ctx.Process(target=measure, args=(mode, games, simulations, seed, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Training throughput and peak memory, per-game graph against minibatches')
+    parser.add_argument('--games', type=int, default=4)
+    parser.add_argument('--simulations', type=int, default=200)
+    args = parser.parse_args()
+    print_table(run(args.games, args.simulations),
+                ['mode', 'positions', 'positions_per_s', 'train_samples_per_s', 'peak_rss_mb', 'rss_growth_mb'])
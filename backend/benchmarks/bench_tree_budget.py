@@ -0,0 +1,83 @@
+# benchmarks/bench_tree_budget.py
+#
+# Process memory over a long run of AI moves with and without a
+# MCTS.TreeBudget. Search trees are kept alive from one move to the next
+# (the subtree under the move actually played is reused), which is where
+# an unbounded tree keeps growing. Each setting runs in a fresh process.
+#
+#     python -m benchmarks.bench_tree_budget --moves 60 --max-nodes 20000
+
+import argparse
+import multiprocessing
+import random
+from copy import copy
+
+import torch
+
+import MCTS
+from ConnectN import ConnectN
+from benchmarks.common import load_app, print_table, seed_everything
+
+
+def rss_mb():
+    # current resident set size, from /proc
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * 4096 / 2**20
+
+
+def long_run(max_nodes, moves, simulations, seed, results):
+    policy = load_app().challenge_policy
+    seed_everything(seed)
+    budget = MCTS.TreeBudget(max_nodes=max_nodes) if max_nodes else None
+    samples = []
+    mytree = None
+    game = ConnectN(size=(6,6), N=4)
+    with torch.no_grad():
+        for move in range(moves):
+            if game.score is not None:
+                game = ConnectN(size=(6,6), N=4)
+                mytree = None
+            if mytree is None:
+                mytree = MCTS.Node(game, budget=budget)
+            for _ in range(simulations):
+                mytree.explore(policy)
+            # the AI moves, then a random reply, keeping the subtree below both
+            mytree, _ = mytree.next(temperature=0.1)
+            mytree.detach_mother()
+            if mytree.outcome is None:
+                if mytree.child:
+                    mytree = random.choice(list(mytree.child.values()))
+                    mytree.detach_mother()
+                else:
+                    game = copy(mytree.game)
+                    game.move(tuple(random.choice(game.available_moves())))
+                    mytree = MCTS.Node(game, budget=budget)
+            game = mytree.game
+            if mytree.outcome is not None:
+                mytree = None
+            samples.append(rss_mb())
+    results.put({'max_nodes': max_nodes or 'none', 'rss_start_mb': samples[0],
+                 'rss_mid_mb': samples[len(samples) // 2], 'rss_end_mb': samples[-1],
+                 'rss_peak_mb': max(samples), 'collapsed': budget.collapsed if budget else 0})
+
+
+def run(max_nodes=20000, moves=60, simulations=1000, seed=0):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    rows = []
+    for limit in (None, max_nodes):
+        process = ctx.Process(target=long_run, args=(limit, moves, simulations, seed, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Process memory over many AI moves with and without a TreeBudget')
+    parser.add_argument('--max-nodes', type=int, default=20000)
+    parser.add_argument('--moves', type=int, default=60)
+    parser.add_argument('--simulations', type=int, default=1000)
+    args = parser.parse_args()
+    print_table(run(args.max_nodes, args.moves, args.simulations),
+                ['max_nodes', 'rss_start_mb', 'rss_mid_mb', 'rss_end_mb', 'rss_peak_mb', 'collapsed'])
@@ -0,0 +1,59 @@
+# benchmarks/bench_tree_export.py
+#
+# Response size and latency of the MCTS tree export per depth:
+# the nested /get_mcts_tree payload against the flat formats of
+# /get_mcts_tree_flat, with and without gzip.
+#
+#     python -m benchmarks.bench_tree_export --depths 1 2 3 4
+
+import argparse
+import gzip
+import json
+
+from ConnectN import ConnectN
+
+from benchmarks.common import build_tree, load_app, print_table, time_call
+import tree_export
+
+
+def nested_payload(main, root, depth):
+    return json.dumps({"tree": main.extract_mcts_tree_data(root, max_depth=depth)}).encode()
+
+
+def flat_payload(root, fmt, depth, compress):
+    chunks = tree_export.iter_export(root, fmt, max_depth=depth)
+    if compress:
+        chunks = tree_export.gzip_chunks(chunks)
+    return b''.join(chunks)
+
+
+def run(depths=(1, 2, 3, 4), simulations=1000, repeat=3):
+    main = load_app()
+    game = ConnectN(**main.game_setting)
+    game.move((2, 2))
+    root = build_tree(main.challenge_policy, game, simulations)
+
+    rows = []
+    for depth in depths:
+        seconds, payload = time_call(lambda: nested_payload(main, root, depth), repeat)
+        rows.append({'depth': depth, 'format': 'nested', 'gzip': False,
+                     'bytes': len(payload), 'ms': seconds * 1000})
+        seconds, payload = time_call(lambda: gzip.compress(nested_payload(main, root, depth)), repeat)
+        rows.append({'depth': depth, 'format': 'nested', 'gzip': True,
+                     'bytes': len(payload), 'ms': seconds * 1000})
+        for fmt in ('ndjson', 'columnar', 'binary'):
+            for compress in (False, True):
+                seconds, payload = time_call(lambda: flat_payload(root, fmt, depth, compress), repeat)
+                rows.append({'depth': depth, 'format': fmt, 'gzip': compress,
+                             'bytes': len(payload), 'ms': seconds * 1000})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Size and latency of the MCTS tree export formats per depth')
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3, 4])
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print_table(run(args.depths, args.simulations, args.repeat),
+                ['depth', 'format', 'gzip', 'bytes', 'ms'])
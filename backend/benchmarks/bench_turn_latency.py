@@ -0,0 +1,102 @@
+# benchmarks/bench_turn_latency.py
+#
+# Per-turn latency of the classic four-request sequence
+# (/make_move, /ai_move, /ai_probability, /get_board) against the single
+# /play_turn request, with several clients hammering a running server.
+#
+#     uvicorn main:app --port 8000 &
+#     python -m benchmarks.bench_turn_latency --clients 4 --turns 20
+
+import argparse
+import http.client
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import http_json, percentile, print_table
+
+
+def empty_cells(board):
+    if isinstance(board, str):
+        return [divmod(k, 6) for k, v in enumerate(board) if v == '0']
+    return [(i, j) for i, row in enumerate(board) for j, v in enumerate(row) if v == 0]
+
+
+def sequential_turn(conn, row, col):
+    status, data = http_json(conn, 'POST', '/make_move', {'row': row, 'col': col})
+    if status != 200:
+        return status, data
+    if data.get('winner') is None:
+        http_json(conn, 'GET', '/ai_move')
+        http_json(conn, 'GET', '/ai_probability')
+    return http_json(conn, 'GET', '/get_board')
+
+
+def combined_turn(conn, row, col, board_format):
+    return http_json(conn, 'POST', '/play_turn', {'row': row, 'col': col, 'board_format': board_format})
+
+
+def client(url, mode, turns, board_format, seed, latencies, errors):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+    rng = random.Random(seed)
+    _, data = http_json(conn, 'GET', '/get_board')
+    board = data['board']
+    for _ in range(turns):
+        cells = empty_cells(board)
+        if data.get('winner') is not None or not cells:
+            _, data = http_json(conn, 'POST', '/start_game', {'player': 1})
+            board = data['board']
+            cells = empty_cells(board)
+        row, col = rng.choice(cells)
+        start = time.perf_counter()
+        if mode == 'sequential':
+            status, data = sequential_turn(conn, row, col)
+        else:
+            status, data = combined_turn(conn, row, col, board_format)
+        elapsed = time.perf_counter() - start
+        if status != 200:
+            # another client moved first on the shared game, resync
+            errors.append(status)
+            _, data = http_json(conn, 'GET', '/get_board')
+        else:
+            latencies.append(elapsed)
+        board = data['board']
+    conn.close()
+
+
+def run(url='http://127.0.0.1:8000', clients=1, turns=10, board_format='compact'):
+    rows = []
+    for mode in ('sequential', 'combined'):
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client,
+                                    args=(url, mode, turns, board_format, seed, latencies, errors))
+                   for seed in range(clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+        rows.append({
+            'mode': mode,
+            'clients': clients,
+            'turns': len(latencies),
+            'errors': len(errors),
+            'p50_ms': 1000 * (percentile(latencies, 50) or 0),
+            'p95_ms': 1000 * (percentile(latencies, 95) or 0),
+            'turns_per_s': len(latencies) / wall,
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Turn latency of the four-request sequence against /play_turn')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=1)
+    parser.add_argument('--turns', type=int, default=10)
+    parser.add_argument('--board-format', default='compact', choices=['list', 'compact'])
+    args = parser.parse_args()
+    print_table(run(args.url, args.clients, args.turns, args.board_format),
+                ['mode', 'clients', 'turns', 'errors', 'p50_ms', 'p95_ms', 'turns_per_s'])
@@ -0,0 +1,75 @@
+# benchmarks/bench_vec_env.py
+#
+# Self-play throughput in positions per second as the number of games B
+# played in lockstep grows: B ConnectN objects stepped one by one with one
+# Policy call each, against one VecConnectN with one batched Policy call.
+#
+#     python -m benchmarks.bench_vec_env --batch 1 16 64 256
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from ConnectN import ConnectN
+from VecConnectN import VecConnectN
+from benchmarks.common import load_app, print_table, seed_everything
+
+
+def sample_actions(prob, rng):
+    # one flat action per row of the (B, w*h) probability array
+    cdf = np.cumsum(prob, axis=1)
+    u = rng.random_sample((prob.shape[0], 1)) * cdf[:, -1:]
+    return np.minimum((cdf < u).sum(axis=1), prob.shape[1] - 1)
+
+
+def run_scalar(policy, B, steps, size, N, rng):
+    games = [ConnectN(size, N) for _ in range(B)]
+    start = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(steps):
+            for b, game in enumerate(games):
+                frame = torch.tensor(game.state * game.player, dtype=torch.float).unsqueeze(0).unsqueeze(0)
+                prob, _ = policy(frame)
+                action = sample_actions(prob.numpy().reshape(1, -1), rng)[0]
+                game.move(divmod(int(action), size[1]))
+                if game.score is not None:
+                    games[b] = ConnectN(size, N)
+    return B * steps / (time.perf_counter() - start)
+
+
+def run_vector(policy, B, steps, size, N, rng):
+    env = VecConnectN(B, size, N)
+    start = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(steps):
+            prob, _ = policy(torch.from_numpy(env.observation()))
+            action = sample_actions(prob.numpy().reshape(B, -1), rng)
+            env.step(action)
+    return B * steps / (time.perf_counter() - start)
+
+
+def run(batches=(1, 16, 64, 256), steps=50, seed=0):
+    main = load_app()
+    policy = main.challenge_policy
+    size, N = main.game_setting['size'], main.game_setting['N']
+    rows = []
+    for B in batches:
+        seed_everything(seed)
+        rng = np.random.RandomState(seed)
+        rows.append({
+            'B': B,
+            'scalar_pos_per_s': run_scalar(policy, B, steps, size, N, rng),
+            'vector_pos_per_s': run_vector(policy, B, steps, size, N, rng),
+        })
+        rows[-1]['speedup'] = rows[-1]['vector_pos_per_s'] / rows[-1]['scalar_pos_per_s']
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Self-play positions per second of ConnectN against VecConnectN')
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 16, 64, 256])
+    parser.add_argument('--steps', type=int, default=50)
+    args = parser.parse_args()
+    print_table(run(args.batch, args.steps), ['B', 'scalar_pos_per_s', 'vector_pos_per_s', 'speedup'])
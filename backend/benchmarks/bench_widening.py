@@ -0,0 +1,83 @@
+# benchmarks/bench_widening.py
+#
+# Progressive widening (MCTS.Widening) against full expansion of every
+# legal move: nodes allocated, traced memory and simulations per second of
+# one search from a fixed position, and a match between the two settings
+# at the same simulation count.
+#
+#     python -m benchmarks.bench_widening --schedules 2,1,0.5 4,1,0.5 4,2,0.5 --games 20
+
+import argparse
+import time
+import tracemalloc
+from copy import copy
+
+import torch
+
+import MCTS
+import arena
+from ConnectN import ConnectN
+from benchmarks.common import load_app, print_table, seed_everything
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.child.values())
+
+
+def search(policy, game, simulations, widening, seed):
+    seed_everything(seed)
+    mytree = MCTS.Node(copy(game), widening=widening)
+    with torch.no_grad():
+        for _ in range(simulations):
+            mytree.explore(policy)
+    return mytree
+
+
+def search_stats(policy, game, simulations, widening, seed=0):
+    # timed without tracing, then repeated under tracemalloc for the memory peak
+    start = time.perf_counter()
+    mytree = search(policy, game, simulations, widening, seed)
+    seconds = time.perf_counter() - start
+    nodes = count_nodes(mytree)
+    del mytree
+
+    tracemalloc.start()
+    search(policy, game, simulations, widening, seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'nodes': nodes, 'peak_kb': peak / 1024, 'sims_per_s': simulations / seconds}
+
+
+def parse_schedule(text):
+    return MCTS.Widening(*(float(x) for x in text.split(',')))
+
+
+def run(schedules=('2,1,0.5', '4,1,0.5', '4,2,0.5'), simulations=1000, games=10, seed=0):
+    policy = load_app().challenge_policy
+    game = ConnectN(size=(6,6), N=4)
+    game.move((2, 2))
+
+    full_player = arena.mcts_player(policy, simulations)
+    rows = [dict(schedule='full', **search_stats(policy, game, simulations, None, seed), score_vs_full='-')]
+    for text in schedules:
+        widening = parse_schedule(text)
+        row = dict(schedule=text, **search_stats(policy, game, simulations, widening, seed))
+        if games:
+            seed_everything(seed)
+            row['score_vs_full'] = arena.play_match(
+                arena.mcts_player(policy, simulations, widening=widening), full_player, games)['score']
+        else:
+            row['score_vs_full'] = '-'
+        rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Progressive widening against full expansion')
+    parser.add_argument('--schedules', nargs='+', default=['2,1,0.5', '4,1,0.5', '4,2,0.5'],
+                        help='initial,factor,exponent of MCTS.Widening')
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--games', type=int, default=10)
+    args = parser.parse_args()
+    print_table(run(args.schedules, args.simulations, args.games),
+                ['schedule', 'nodes', 'peak_kb', 'sims_per_s', 'score_vs_full'])
@@ -0,0 +1,95 @@
+# benchmarks/bench_workers.py
+#
+# Throughput of the server with several uvicorn worker processes sharing
+# their sessions through SQLite (AI_SESSION_STORE=sqlite:...). Every stage
+# starts a server with that many workers, warms it up, plays games with the
+# simulated players of benchmarks.loadgen (each in a session of its own, so
+# any worker can serve any request) and stops it.
+#
+#     python -m benchmarks.bench_workers --workers 1 2 4 8 --players 16 --duration 30
+
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import http_json, print_table
+from benchmarks.loadgen import run_stage
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workers, port, store):
+    env = dict(os.environ, AI_SESSION_STORE=f'sqlite:{store}')
+    # a process group of its own, so that the workers are stopped with it
+    return subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port),
+                             '--workers', str(workers), '--log-level', 'warning'],
+                            cwd=BACKEND, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(port, timeout=180):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            status, _ = http_json(conn, 'GET', '/get_board')
+            conn.close()
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'server on port {port} did not start within {timeout} s')
+
+
+def stop_server(proc):
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Server throughput per number of uvicorn workers sharing a SQLite session store')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--players', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per stage')
+    parser.add_argument('--warmup', type=float, default=10.0,
+                        help='seconds of play before every stage, until all workers are up')
+    parser.add_argument('--think', type=float, nargs=2, default=[0.1, 0.5], metavar=('MIN', 'MAX'))
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = start_server(workers, args.port, os.path.join(tmp, 'sessions.db'))
+            try:
+                wait_ready(args.port)
+                url = f'http://127.0.0.1:{args.port}'
+                run_stage(url, args.players, args.warmup, args.think, None, seed=args.seed)
+                results, _ = run_stage(url, args.players, args.duration, args.think, None, seed=args.seed)
+            finally:
+                stop_server(proc)
+        by_path = {r['endpoint']: r for r in results}
+        ai = by_path.get('/ai_move', {})
+        rows.append({
+            'workers': workers,
+            'req_per_s': sum(r['req_per_s'] for r in results),
+            'ai_move_per_s': ai.get('req_per_s', 0),
+            'ai_move_p95_ms': ai.get('p95_ms', 0),
+            'make_move_p95_ms': by_path.get('/make_move', {}).get('p95_ms', 0),
+            'error_pct': max((r['error_pct'] for r in results), default=0),
+        })
+        print_table(rows[-1:], list(rows[-1]))
+
+    print(f'\n{args.players} players, {os.cpu_count()} CPUs')
+    print_table(rows, ['workers', 'req_per_s', 'ai_move_per_s', 'ai_move_p95_ms', 'make_move_p95_ms', 'error_pct'])
@@ -0,0 +1,112 @@
+# benchmarks/common.py
+import random
+import statistics
+import time
+from collections import deque
+from copy import copy
+
+import numpy as np
+import torch
+
+
+def seed_everything(seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def load_app():
+    # importing main loads the challenge policy and builds the FastAPI app
+    import main
+    return main
+
+
+def time_call(fn, repeat=5):
+    """
+    Call fn() repeat times, return (median seconds, last result).
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def build_tree(policy, game, simulations=1000, seed=0):
+    # a reproducible search tree from the given position
+    import MCTS
+
+    seed_everything(seed)
+    mytree = MCTS.Node(copy(game))
+    for _ in range(simulations):
+        mytree.explore(policy)
+    return mytree
+
+
+class GameWindow:
+    """
+    Detached training records of the most recent games, in memory, for the
+    training benchmarks (train.py trains on a MemmapReplayBuffer). Only plain
+    arrays are kept, so no autograd graph outlives the forward pass of its
+    minibatch.
+    """
+
+    def __init__(self, games):
+        self.games = deque(maxlen=games)
+
+    def __len__(self):
+        return sum(len(records) for records in self.games)
+
+    def add_game(self, records):
+        self.games.append(records)
+
+    def minibatches(self, batch_size):
+        # one shuffled pass over every position in the window, as tensors
+        records = [record for game in self.games for record in game]
+        random.shuffle(records)
+        for k in range(0, len(records) - batch_size + 1, batch_size):
+            boards, p, z, full = zip(*records[k:k + batch_size])
+            yield (torch.tensor(np.stack(boards), dtype=torch.float).unsqueeze(1),
+                   torch.tensor(np.stack(p)),
+                   torch.tensor(np.array(z), dtype=torch.float),
+                   torch.tensor(np.array(full), dtype=torch.float))
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(c)), *(len(_fmt(r[c])) for r in rows)) for c in columns]
+    print('  '.join(str(c).rjust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print('  '.join(_fmt(r[c]).rjust(w) for c, w in zip(columns, widths)))
+
+
+def _fmt(value):
+    if isinstance(value, float):
+        return f'{value:.4g}'
+    return str(value)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def http_json(conn, method, path, body=None, headers=None):
+    """
+    One request on a keep-alive http.client connection, returns (status, json).
+    """
+    import json
+
+    headers = dict(headers or {})
+    payload = None
+    if body is not None:
+        payload = json.dumps(body)
+        headers['Content-Type'] = 'application/json'
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, json.loads(data) if data else None
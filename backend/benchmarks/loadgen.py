@@ -0,0 +1,273 @@
+# benchmarks/loadgen.py
+#
+# Load generator for a running backend: every simulated player is a thread
+# with its own keep-alive connection that plays whole games through
+# /start_game, /make_move, /ai_move and /ai_probability, thinking between
+# moves. Reports per endpoint throughput, p50/p95/p99 latency and error
+# rate, and with --server-pid the CPU and RSS of the server over time.
+#
+# Several --players values run one stage each, to find the concurrency
+# knee. The requests of all the stages can be recorded (--record) and
+# replayed later, stage after stage, with their original timing (--replay).
+#
+#     uvicorn main:app --port 8000 &
+#     python -m benchmarks.loadgen --players 10 50 100 --duration 60 --think 1 3 --server-pid $!
+#     python -m benchmarks.loadgen --players 50 --duration 30 --record requests.jsonl
+#     python -m benchmarks.loadgen --replay requests.jsonl
+
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+from benchmarks.common import http_json, percentile, print_table
+
+
+def empty_cells(board):
+    return [(i, j) for i, row in enumerate(board) for j, v in enumerate(row) if v == 0]
+
+
+class Recorder:
+    # every request of a stage with its outcome; optionally written to log, an open
+    # JSONL file shared by the stages of a run, as a replayable record
+
+    def __init__(self, log=None, stage=0):
+        self.lock = threading.Lock()
+        self.results = []
+        self.start = time.perf_counter()
+        self.log = log
+        self.stage = stage
+
+    def request(self, conn, player, method, path, body=None, headers=None):
+        start = time.perf_counter()
+        try:
+            status, data = http_json(conn, method, path, body, headers)
+        except (OSError, http.client.HTTPException, ValueError):
+            status, data = 0, None
+            conn.close()
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.results.append((start - self.start, path, status, elapsed))
+            if self.log is not None:
+                self.log.write(json.dumps({'t': start - self.start, 'stage': self.stage, 'player': player,
+                                           'method': method, 'path': path, 'body': body}) + '\n')
+        return status, data
+
+
+def session_headers(data):
+    # servers with sessions return a session_id from /start_game, sent back on every request
+    if data and data.get('session_id'):
+        return {'X-Session-Id': str(data['session_id'])}
+    return {}
+
+
+def player_session(prefix, index):
+    # every player starts its games in a session of its own
+    return {'X-Session-Id': f'{prefix}-{index}'}
+
+
+def player(url, index, deadline, think, script, recorder, seed):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=300)
+    rng = random.Random(seed)
+    games = 0
+    while time.perf_counter() < deadline:
+        status, data = recorder.request(conn, index, 'POST', '/start_game', {'player': 1},
+                                        player_session(f'loadgen{os.getpid()}', index))
+        if status != 200:
+            time.sleep(1)
+            continue
+        headers = session_headers(data)
+        board = data['board']
+        moves = list(script[(index + games) % len(script)]) if script else []
+        games += 1
+
+        while time.perf_counter() < deadline:
+            time.sleep(rng.uniform(*think))
+            cells = empty_cells(board)
+            if not cells:
+                break
+            move = tuple(moves.pop(0)) if moves else None
+            if move not in cells:
+                move = rng.choice(cells)
+            status, data = recorder.request(conn, index, 'POST', '/make_move',
+                                            {'row': move[0], 'col': move[1]}, headers)
+            if status != 200 or data.get('winner') is not None or data.get('status') == 'Game over':
+                break
+            status, data = recorder.request(conn, index, 'GET', '/ai_move', None, headers)
+            if status != 200 or data.get('winner') is not None or data.get('status') == 'Game over':
+                break
+            board = data['board']
+            recorder.request(conn, index, 'GET', '/ai_probability', None, headers)
+    conn.close()
+
+
+def replayer(url, index, requests, recorder):
+    # replay the requests of one recorded player at their original offsets
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=300)
+    headers = player_session('replay', index)
+    for request in requests:
+        wait = request['t'] - (time.perf_counter() - recorder.start)
+        if wait > 0:
+            time.sleep(wait)
+        status, data = recorder.request(conn, index, request['method'], request['path'],
+                                        request['body'], headers)
+        if request['path'] == '/start_game' and status == 200:
+            headers = session_headers(data)
+    conn.close()
+
+
+class ServerMonitor:
+    # CPU percent and RSS of the server process, from /proc, once per interval
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def cpu_seconds(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime and stime, fields 14 and 15 of stat
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def rss_bytes(self):
+        with open(f'/proc/{self.pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    def run(self):
+        start = time.perf_counter()
+        last_time, last_cpu = start, self.cpu_seconds()
+        while not self.stopping.wait(self.interval):
+            try:
+                now, cpu = time.perf_counter(), self.cpu_seconds()
+                self.samples.append({'t_s': now - start, 'cpu_pct': 100 * (cpu - last_cpu) / (now - last_time),
+                                     'rss_mb': self.rss_bytes() / 2**20})
+            except OSError:
+                return
+            last_time, last_cpu = now, cpu
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopping.set()
+        self.thread.join()
+
+
+def summarize(results, wall):
+    # one row per endpoint: throughput, latency percentiles and error rate
+    by_path = defaultdict(list)
+    for _, path, status, elapsed in results:
+        by_path[path].append((status, elapsed))
+    rows = []
+    for path in sorted(by_path):
+        calls = by_path[path]
+        ok = [elapsed for status, elapsed in calls if status == 200]
+        rows.append({
+            'endpoint': path,
+            'requests': len(calls),
+            'req_per_s': len(calls) / wall,
+            'p50_ms': 1000 * (percentile(ok, 50) or 0),
+            'p95_ms': 1000 * (percentile(ok, 95) or 0),
+            'p99_ms': 1000 * (percentile(ok, 99) or 0),
+            'error_pct': 100 * (len(calls) - len(ok)) / len(calls),
+        })
+    return rows
+
+
+def run_stage(url, players, duration, think, script, log=None, replay=None, server_pid=None, seed=0, stage=0):
+    recorder = Recorder(log, stage)
+    if replay:
+        by_player = defaultdict(list)
+        for request in replay:
+            by_player[request['player']].append(request)
+        threads = [threading.Thread(target=replayer, args=(url, index, requests, recorder))
+                   for index, requests in by_player.items()]
+    else:
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=player,
+                                    args=(url, index, deadline, think, script, recorder, seed + index))
+                   for index in range(players)]
+
+    start = time.perf_counter()
+    with ServerMonitor(server_pid) if server_pid else nullcontext() as monitor:
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+    wall = time.perf_counter() - start
+    return summarize(recorder.results, wall), monitor.samples if monitor else []
+
+
+def load_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load generator simulating players of a running backend')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--players', type=int, nargs='+', default=[10],
+                        help='concurrent players, one stage per value')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per stage')
+    parser.add_argument('--think', type=float, nargs=2, default=[0.5, 2.0], metavar=('MIN', 'MAX'),
+                        help='human think time per move, uniform in seconds')
+    parser.add_argument('--script', help='JSON list of games, each a list of [row, col] human moves')
+    parser.add_argument('--record', help='write the requests to this JSONL file')
+    parser.add_argument('--replay', help='replay a JSONL file written by --record instead of playing')
+    parser.add_argument('--server-pid', type=int, help='sample CPU and RSS of this process (Linux)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    # one list of requests per recorded stage, replayed one after the other
+    replays = [None]
+    if args.replay:
+        by_stage = defaultdict(list)
+        for request in load_jsonl(args.replay):
+            by_stage[request.get('stage', 0)].append(request)
+        replays = [by_stage[stage] for stage in sorted(by_stage)]
+
+    # one record file for all the stages of the run
+    log = open(args.record, 'w') if args.record else None
+    knee = []
+    stages = [(None, replay) for replay in replays] if args.replay else [(players, None) for players in args.players]
+    for stage, (players, replay) in enumerate(stages):
+        rows, samples = run_stage(args.url, players, args.duration, args.think, script,
+                                  log, replay, args.server_pid, args.seed, stage)
+        if replay:
+            players = len({request['player'] for request in replay})
+            print(f'\n== replay of {args.replay}, stage {stage}: {players} players')
+        else:
+            print(f'\n== {players} players')
+        print_table(rows, ['endpoint', 'requests', 'req_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'error_pct'])
+        if samples:
+            print()
+            print_table(samples, ['t_s', 'cpu_pct', 'rss_mb'])
+        ai = next((r for r in rows if r['endpoint'] == '/ai_move'), None)
+        if ai:
+            knee.append({'players': players, 'ai_move_per_s': ai['req_per_s'], 'ai_move_p95_ms': ai['p95_ms'],
+                         'max_cpu_pct': max((s['cpu_pct'] for s in samples), default=0),
+                         'max_rss_mb': max((s['rss_mb'] for s in samples), default=0)})
+
+    if len(knee) > 1:
+        # throughput flattening while p95 keeps growing marks the knee
+        print('\n== stages')
+        print_table(knee, ['players', 'ai_move_per_s', 'ai_move_p95_ms', 'max_cpu_pct', 'max_rss_mb'])
+    if log is not None:
+        log.close()
@@ -0,0 +1,180 @@
+# benchmarks/suite.py
+#
+# Reproducible benchmark suite over the layers of the backend:
+#   engine     ConnectN.move and ConnectN.get_score
+#   search     MCTS.Node.explore on a fixed, seeded corpus of positions
+#   inference  Policy forward passes across batch sizes
+#   api        /ai_move, /get_mcts_tree and /get_mcts_summary through a test client
+#
+# Every metric is written to a JSON file and can be compared against a
+# stored baseline, see benchmarks/__main__.py for the command line.
+
+import json
+import platform
+import statistics
+import time
+from copy import copy
+
+import numpy as np
+import torch
+
+import MCTS
+from ConnectN import ConnectN
+from benchmarks.common import load_app, seed_everything
+
+SUITES = ('engine', 'search', 'inference', 'api')
+
+game_setting = {'size': (6,6), 'N':4}
+
+
+def metric(value, unit, higher_is_better=True):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def position_corpus(count=8, seed=0):
+    # positions after 2 to 12 random moves that are not over yet, the same for a given seed
+    rng = np.random.RandomState(seed)
+    positions = []
+    while len(positions) < count:
+        game = ConnectN(**game_setting)
+        for _ in range(rng.randint(2, 13)):
+            moves = game.available_moves()
+            game.move(tuple(moves[rng.randint(len(moves))]))
+            if game.score is not None:
+                break
+        if game.score is None:
+            positions.append(game)
+    return positions
+
+
+def bench_engine(quick=False, seed=0):
+    # random games played move by move, then get_score alone on the corpus
+    rng = np.random.RandomState(seed)
+    games = 50 if quick else 500
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        game = ConnectN(**game_setting)
+        while game.score is None:
+            available = game.available_moves()
+            game.move(tuple(available[rng.randint(len(available))]))
+            moves += 1
+    move_seconds = time.perf_counter() - start
+
+    positions = position_corpus(seed=seed)
+    calls = 2000 if quick else 20000
+    start = time.perf_counter()
+    for k in range(calls):
+        positions[k % len(positions)].get_score()
+    score_seconds = time.perf_counter() - start
+
+    return {'engine.moves_per_s': metric(moves / move_seconds, 'moves/s'),
+            'engine.get_score_per_s': metric(calls / score_seconds, 'calls/s')}
+
+
+def bench_search(policy, quick=False, seed=0):
+    simulations = 100 if quick else 500
+    total = 0
+    seconds = 0.0
+    for game in position_corpus(seed=seed):
+        seed_everything(seed)
+        mytree = MCTS.Node(copy(game), autograd=False)
+        start = time.perf_counter()
+        for _ in range(simulations):
+            mytree.explore(policy)
+        seconds += time.perf_counter() - start
+        total += simulations
+    return {'search.simulations_per_s': metric(total / seconds, 'simulations/s')}
+
+
+def bench_inference(policy, quick=False, batch_sizes=(1, 16, 64, 256)):
+    w, h = game_setting['size']
+    repeat = 20 if quick else 200
+    results = {}
+    with torch.no_grad():
+        for B in batch_sizes:
+            boards = torch.zeros(B, 1, w, h)
+            policy(boards)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                policy(boards)
+            seconds = time.perf_counter() - start
+            results[f'inference.boards_per_s.batch{B}'] = metric(B * repeat / seconds, 'boards/s')
+    return results
+
+
+def bench_api(main, quick=False, seed=0):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    repeat = 2 if quick else 5
+    timings = {'ai_move': [], 'get_mcts_tree': [], 'get_mcts_summary': []}
+    for k in range(repeat):
+        seed_everything(seed + k)
+        client.post('/start_game', json={'player': 1})
+        client.post('/make_move', json={'row': k % 6, 'col': (2 * k) % 6})
+        for name, path in (('ai_move', '/ai_move'), ('get_mcts_tree', '/get_mcts_tree'),
+                           ('get_mcts_summary', '/get_mcts_summary')):
+            start = time.perf_counter()
+            response = client.get(path)
+            timings[name].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} returned {response.status_code}: {response.text}')
+    return {f'api.{name}_ms': metric(statistics.median(t) * 1000, 'ms', higher_is_better=False)
+            for name, t in timings.items()}
+
+
+def run(suites=SUITES, quick=False, seed=0):
+    seed_everything(seed)
+    results = {}
+    main = load_app() if set(suites) & {'search', 'inference', 'api'} else None
+    if 'engine' in suites:
+        results.update(bench_engine(quick, seed))
+    if 'search' in suites:
+        results.update(bench_search(main.challenge_policy, quick, seed))
+    if 'inference' in suites:
+        results.update(bench_inference(main.challenge_policy, quick))
+    if 'api' in suites:
+        results.update(bench_api(main, quick, seed))
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'torch': torch.__version__,
+            'torch_threads': torch.get_num_threads(),
+            'quick': quick,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=0.1):
+    """
+    Compare the results of two runs. A metric regresses when it is worse than
+    the baseline by more than threshold (a fraction, 0.1 = 10%).
+    Returns one row per metric present in both.
+    """
+    rows = []
+    for name, new in sorted(current['results'].items()):
+        old = baseline['results'].get(name)
+        if old is None or not old['value']:
+            continue
+        change = (new['value'] - old['value']) / old['value']
+        worse = -change if new['higher_is_better'] else change
+        rows.append({'metric': name, 'baseline': old['value'], 'current': new['value'],
+                     'change_pct': change * 100,
+                     'status': 'REGRESSION' if worse > threshold else 'ok'})
+    return rows
+
+
+def save(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,176 @@
+# instrumentation.py
+#
+# Switchable counters for the search and the HTTP endpoints, exposed in the
+# Prometheus text format by main.py on /metrics.
+#
+# When disabled (the default), MCTS.Node.explore only pays for one check of
+# `enabled`. When enabled, every explore call measures the time spent in
+#   selection     walking down the tree (including progressive widening)
+#   policy        the network evaluation of process_policy
+#   create_child  copying the game for every new child
+#   backup        updating N, V and the sibling U on the way back up
+#   prune         collapsing subtrees of a tree over its TreeBudget
+# and adds it, with the call counts, nodes created and the selection depth,
+# to the process-wide totals below.
+
+import threading
+import time
+from bisect import bisect_left
+
+enabled = False
+
+PHASES = ('selection', 'policy', 'create_child', 'backup', 'prune')
+
+# histogram buckets, in seconds for latencies
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEPTH_BUCKETS = (1, 2, 4, 6, 8, 12, 16, 24, 36)
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+class Histogram:
+    # cumulative histogram with Prometheus semantics (le buckets, sum, count)
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value, n=1):
+        self.counts[bisect_left(self.buckets, value)] += n
+        self.sum += value * n
+        self.count += n
+
+    def lines(self, name, labels=''):
+        out = []
+        total = 0
+        for le, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            out.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {total}')
+        suffix = f'{{{labels}}}' if labels else ''
+        out.append(f'{name}_sum{suffix} {self.sum}')
+        out.append(f'{name}_count{suffix} {self.count}')
+        return out
+
+
+class SearchStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.phase_calls = dict.fromkeys(PHASES, 0)
+        self.simulations = 0
+        self.nodes_created = 0
+        self.depth = Histogram(DEPTH_BUCKETS)
+        self.searches = 0
+        self.search_seconds = 0.0
+        self.last_simulations_per_second = 0.0
+
+    def add_search(self, simulations, seconds):
+        # one whole AI search, for the simulations per second
+        with self.lock:
+            self.searches += 1
+            self.search_seconds += seconds
+            if seconds > 0:
+                self.last_simulations_per_second = simulations / seconds
+
+
+class ExploreTimer:
+    # phase times of one Node.explore call, added to the totals by finish()
+    __slots__ = ('last', 'seconds', 'nodes', 'depth')
+
+    def __init__(self):
+        self.last = time.perf_counter()
+        self.seconds = {}
+        self.nodes = 0
+        self.depth = 0
+
+    def mark(self, phase):
+        # the time since the previous mark goes to phase
+        now = time.perf_counter()
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def finish(self):
+        with search_stats.lock:
+            for phase, seconds in self.seconds.items():
+                search_stats.phase_seconds[phase] += seconds
+                search_stats.phase_calls[phase] += 1
+            search_stats.simulations += 1
+            search_stats.nodes_created += self.nodes
+            search_stats.depth.observe(self.depth)
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}
+
+    def observe(self, method, path, status, seconds):
+        key = (method, path, str(status))
+        with self.lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.latency[key].observe(seconds)
+
+
+search_stats = SearchStats()
+request_stats = RequestStats()
+
+
+def render(extra=()):
+    """
+    All metrics in the Prometheus text exposition format. extra holds
+    (name, type, help, [(labels, value)]) tuples of other modules.
+    """
+    lines = ['# HELP instrumentation_enabled 1 when search and request instrumentation is on',
+             '# TYPE instrumentation_enabled gauge',
+             f'instrumentation_enabled {int(enabled)}']
+
+    s = search_stats
+    with s.lock:
+        lines += ['# HELP mcts_phase_seconds_total Time spent in every phase of Node.explore',
+                  '# TYPE mcts_phase_seconds_total counter']
+        lines += [f'mcts_phase_seconds_total{{phase="{p}"}} {s.phase_seconds[p]}' for p in PHASES]
+        lines += ['# HELP mcts_phase_calls_total Node.explore calls that went through every phase',
+                  '# TYPE mcts_phase_calls_total counter']
+        lines += [f'mcts_phase_calls_total{{phase="{p}"}} {s.phase_calls[p]}' for p in PHASES]
+        lines += ['# HELP mcts_simulations_total Node.explore calls',
+                  '# TYPE mcts_simulations_total counter',
+                  f'mcts_simulations_total {s.simulations}',
+                  '# HELP mcts_nodes_created_total Nodes added to search trees',
+                  '# TYPE mcts_nodes_created_total counter',
+                  f'mcts_nodes_created_total {s.nodes_created}',
+                  '# HELP mcts_selection_depth Depth of the node every simulation expanded',
+                  '# TYPE mcts_selection_depth histogram']
+        lines += s.depth.lines('mcts_selection_depth')
+        lines += ['# HELP mcts_searches_total AI searches',
+                  '# TYPE mcts_searches_total counter',
+                  f'mcts_searches_total {s.searches}',
+                  '# HELP mcts_search_seconds_total Wall-clock time of the AI searches',
+                  '# TYPE mcts_search_seconds_total counter',
+                  f'mcts_search_seconds_total {s.search_seconds}',
+                  '# HELP mcts_simulations_per_second Simulations per second of the last AI search',
+                  '# TYPE mcts_simulations_per_second gauge',
+                  f'mcts_simulations_per_second {s.last_simulations_per_second}']
+
+    with request_stats.lock:
+        lines += ['# HELP http_request_duration_seconds Latency of the HTTP endpoints',
+                  '# TYPE http_request_duration_seconds histogram']
+        for (method, path, status), histogram in sorted(request_stats.latency.items()):
+            labels = f'method="{method}",path="{path}",status="{status}"'
+            lines += histogram.lines('http_request_duration_seconds', labels)
+
+    for name, kind, help, samples in extra:
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+        for labels, value in samples:
+            lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
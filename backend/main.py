@@ -1,7 +1,11 @@
 # src/main.py
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
 from ConnectN import ConnectN
 import MCTS
 import torch
@@ -11,9 +15,28 @@ import json
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
-from policy import Policy
+from policy import Policy, load_policy
+import tree_export
+import instrumentation
+import profiling
+from root_parallel import RootParallelSearch
+from ponder import PauseGate, Ponderer
+from model_registry import ModelRegistry
+from search_executor import CancelToken, QueueFull, SearchCancelled, SearchExecutor
+import sessions
+from response_cache import ResponseCache, etag_matches
+from sessions import DEFAULT_SESSION, valid_session_id
+from tree_export import get_best_path_ids
+import asyncio
+import os
+import secrets
 import sys
 import math
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
 sys.modules['__main__'] = sys.modules[__name__]
@@ -31,14 +54,196 @@ app.add_middleware(
 
 AI_PLAYER = -1
 
+# Number of MCTS simulations per AI move
+AI_SIMULATIONS = 1000
+
+# Root search of the AI: "puct" (explore/next), "gumbel" (MCTS.gumbel_search),
+# which needs far fewer simulations for the same strength, or "root_parallel"
+# (PUCT split over AI_WORKERS processes)
+AI_SEARCH = os.environ.get("AI_SEARCH", "puct")
+GUMBEL_SIMULATIONS = int(os.environ.get("GUMBEL_SIMULATIONS", 128))
+
+# Number of searches run in parallel processes for AI_SEARCH="root_parallel" (see root_parallel.py)
+AI_WORKERS = int(os.environ.get("AI_WORKERS", os.cpu_count() or 1))
+
+# Progressive widening of the search tree as "initial,factor,exponent" (see MCTS.Widening),
+# unset to expand every legal move
+AI_WIDENING = os.environ.get("AI_WIDENING")
+AI_WIDENING = MCTS.Widening(*(float(x) for x in AI_WIDENING.split(","))) if AI_WIDENING else None
+
+# Pondering (see ponder.py): keep searching on the human's time, up to
+# AI_PONDER_SIMULATIONS per position, only with AI_SEARCH="puct"
+AI_PONDER = os.environ.get("AI_PONDER", "0") == "1"
+AI_PONDER_SIMULATIONS = int(os.environ.get("AI_PONDER_SIMULATIONS", 20000))
+
+# Search phase timings and endpoint latency histograms on /metrics (see instrumentation.py)
+AI_METRICS = os.environ.get("AI_METRICS", "0") == "1"
+instrumentation.enable(AI_METRICS)
+
+# Debug endpoints (/debug/...), off in production
+AI_DEBUG_ENDPOINTS = os.environ.get("AI_DEBUG_ENDPOINTS", "0") == "1"
+# Finished profile captures are also written to this directory, when set
+AI_PROFILE_DIR = os.environ.get("AI_PROFILE_DIR")
+
+# Memory cap of every search tree (see MCTS.TreeBudget), unset for no limit
+AI_MAX_NODES = int(os.environ["AI_MAX_NODES"]) if os.environ.get("AI_MAX_NODES") else None
+AI_MAX_TREE_BYTES = int(os.environ["AI_MAX_TREE_BYTES"]) if os.environ.get("AI_MAX_TREE_BYTES") else None
+
+# AI searches run on their own threads (see search_executor.py): at most AI_SEARCH_THREADS
+# at once and AI_SEARCH_QUEUE waiting, the others are rejected with a 503. Waiting searches
+# get fewer simulations, down to AI_MIN_BUDGET_FRACTION of the budget with a full queue
+AI_SEARCH_THREADS = int(os.environ.get("AI_SEARCH_THREADS", 2))
+AI_SEARCH_QUEUE = int(os.environ.get("AI_SEARCH_QUEUE", 8))
+AI_MIN_BUDGET_FRACTION = float(os.environ.get("AI_MIN_BUDGET_FRACTION", 0.25))
+
+# Where the game sessions are kept (see sessions.py): "memory" for a single worker,
+# "sqlite:PATH" to share them between the workers of `uvicorn --workers N`
+AI_SESSION_STORE = os.environ.get("AI_SESSION_STORE", "memory")
+# Sessions not changed for this many seconds are dropped
+AI_SESSION_TTL = float(os.environ.get("AI_SESSION_TTL", 24 * 3600))
+# Search trees kept per worker for the tree endpoints
+AI_MAX_SESSION_TREES = int(os.environ.get("AI_MAX_SESSION_TREES", 64))
+
+store = sessions.open_store(AI_SESSION_STORE)
+
+# Bytes of encoded payloads of the polling endpoints kept per worker (see response_cache.py)
+AI_RESPONSE_CACHE_BYTES = int(os.environ.get("AI_RESPONSE_CACHE_BYTES", 64 * 2**20))
+
+response_cache = ResponseCache(AI_RESPONSE_CACHE_BYTES)
+
 # Initialize the game settings
 game_setting = {'size': (6,6), 'N':4}
 
 # Load the policy
 game = ConnectN(**game_setting)
 policy = Policy(game)
-# Load the saved model (adjust the path if necessary)
-challenge_policy = torch.load('6-6-4-pie.policy')
+
+# The model of the AI is served by a ModelRegistry (see model_registry.py) and can be replaced
+# with POST /admin/reload_model. The checkpoint to serve and its version are kept in the session
+# store, every AI_MODEL_POLL_SECONDS the workers check it and load a newer one
+AI_MODEL_PATH = os.environ.get("AI_MODEL_PATH", "6-6-4-pie.policy")
+AI_MODEL_POLL_SECONDS = float(os.environ.get("AI_MODEL_POLL_SECONDS", 5))
+# Token expected in the X-Admin-Token header of the /admin endpoints, unset to disable them
+AI_ADMIN_TOKEN = os.environ.get("AI_ADMIN_TOKEN")
+
+# First forward passes and a short search, paid before a model serves requests
+def warm_up(policy):
+    with torch.no_grad():
+        for batch in (1, 8):
+            _, value = policy(torch.zeros(batch, 1, *game_setting['size']))
+            if not torch.isfinite(value).all():
+                raise ValueError("The model returns non-finite values")
+    mytree = MCTS.Node(ConnectN(**game_setting), autograd=False)
+    for _ in range(32):
+        mytree.explore(policy)
+
+def model_record():
+    record = store.get_meta("model")
+    return json.loads(record) if record is not None else None
+
+models = ModelRegistry(lambda path: load_policy(path, game), warm_up)
+# a reload requested before this worker started is served right away,
+# unless that checkpoint does not load
+initial_model = model_record()
+if initial_model is not None:
+    try:
+        models.load(initial_model["path"], initial_model["version"])
+    except Exception as e:
+        print(f"Error loading {initial_model['path']}, serving {AI_MODEL_PATH}: {e}")  # Debug log
+if models.current is None:
+    models.load(AI_MODEL_PATH, 0)
+# the policy of new searches, replaced by every reload (see use_new_model)
+challenge_policy = models.current.policy
+
+# Latency histogram of every endpoint, labelled with the route rather than the raw path
+@app.middleware("http")
+async def record_request_latency(request, call_next):
+    if not instrumentation.enabled:
+        return await call_next(request)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        instrumentation.request_stats.observe(request.method, path, status, time.perf_counter() - start)
+
+pondering = AI_PONDER and AI_SEARCH == "puct"
+
+# Ponderer of every session of this worker, with the time it was last used; like the search
+# trees the least recently used ones are dropped beyond AI_MAX_SESSION_TREES, and the ones
+# unused for AI_SESSION_TTL with the sessions (see purge_sessions)
+session_ponderers = OrderedDict()
+session_ponderers_lock = threading.Lock()
+# shared by all of them, so that a ponderer started during a request waits for its end too
+ponder_gate = PauseGate()
+
+# Ponderer of the session, None when it has none
+def session_ponderer(session_id):
+    with session_ponderers_lock:
+        entry = session_ponderers.get(session_id)
+        if entry is None:
+            return None
+        session_ponderers[session_id] = (entry[0], time.time())
+        session_ponderers.move_to_end(session_id)
+        return entry[0]
+
+# Ponder on tree, the node of the position the human of the session has to answer
+def start_pondering(session_id, tree):
+    with session_ponderers_lock:
+        entry = session_ponderers.get(session_id)
+        if entry is not None:
+            ponderer = entry[0]
+        else:
+            ponderer = Ponderer(challenge_policy, AI_PONDER_SIMULATIONS, gate=ponder_gate)
+        session_ponderers[session_id] = (ponderer, time.time())
+        session_ponderers.move_to_end(session_id)
+        evicted = []
+        while len(session_ponderers) > AI_MAX_SESSION_TREES:
+            evicted.append(session_ponderers.popitem(last=False)[1][0])
+    for old in evicted:
+        old.discard()
+    ponderer.start(tree)
+    # dropped while it started
+    with session_ponderers_lock:
+        dropped = session_ponderers.get(session_id, (None, None))[0] is not ponderer
+    if dropped:
+        ponderer.discard()
+
+def drop_ponderers(session_ids=None):
+    # of the given sessions, of every session when None
+    with session_ponderers_lock:
+        if session_ids is None:
+            session_ids = list(session_ponderers)
+        dropped = [session_ponderers.pop(s)[0] for s in session_ids if s in session_ponderers]
+    for ponderer in dropped:
+        ponderer.discard()
+
+# Pondering pauses while a request is handled, including the streaming of its body
+@app.middleware("http")
+async def pause_pondering(request, call_next):
+    if not pondering:
+        return await call_next(request)
+    await run_in_threadpool(ponder_gate.pause)
+    try:
+        response = await call_next(request)
+    except Exception:
+        ponder_gate.resume()
+        raise
+    body = response.body_iterator
+
+    async def paused_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            ponder_gate.resume()
+
+    response.body_iterator = paused_body()
+    return response
 
 # Define Pydantic models
 class Move(BaseModel):
@@ -48,87 +253,297 @@ class Move(BaseModel):
 class StartGameRequest(BaseModel):
     player: int  # 1 for first (Player X), -1 for second (Player O)
 
-# Initialize the game
-game = ConnectN(**game_setting)
+class ProfileRequest(BaseModel):
+    mode: str = "deterministic"  # or "sampling", see profiling.py
+    searches: Optional[int] = None  # profile the next `searches` AI searches,
+    seconds: Optional[float] = None  # or the ones within the next `seconds`
+    interval_ms: float = 5.0  # sampling interval
+
+class TurnRequest(BaseModel):
+    row: int
+    col: int
+    board_format: str = "list"  # "list" or "compact", see encode_board
+
+BOARD_FORMATS = ("list", "compact")
+
+# "list" is the nested list of floats used everywhere else,
+# "compact" is one character per cell in row-major order: '0' empty, '1' player 1, '2' player -1
+def encode_board(state, board_format="list"):
+    if board_format == "compact":
+        return "".join("012"[int(v)] for v in state.flat)
+    return state.tolist()
+
+# Session of a request: the X-Session-Id header, or the default session shared by the
+# clients that send none (see sessions.py)
+def get_session_id(x_session_id: Optional[str] = Header(None)):
+    if x_session_id is None:
+        return DEFAULT_SESSION
+    if not valid_session_id(x_session_id):
+        raise HTTPException(status_code=400, detail="Invalid session id")
+    return x_session_id
+
+# The default session starts with a new game, the others with /start_game
+def load_session(session_id):
+    session = store.get(session_id)
+    if session is None:
+        if session_id != DEFAULT_SESSION:
+            raise HTTPException(status_code=404, detail="Unknown session, start a game first")
+        session = store.reset(DEFAULT_SESSION, ConnectN(**game_setting))
+    return session
+
+# Change the game of a session, saved with a new version when session.touch() was called
+@contextmanager
+def session_transaction(session_id):
+    load_session(session_id)
+    with store.transaction(session_id) as session:
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown session, start a game first")
+        yield session
+
+last_purge = 0.0
+
+def purge_sessions():
+    # at most once a minute per worker
+    global last_purge
+    if time.time() - last_purge > 60:
+        last_purge = time.time()
+        store.purge(AI_SESSION_TTL)
+        with session_ponderers_lock:
+            expired = [s for s, (_, used) in session_ponderers.items() if used < last_purge - AI_SESSION_TTL]
+        drop_ponderers(expired)
+
+def session_version(session_id):
+    version = store.version(session_id)
+    if version is None:
+        version = load_session(session_id).version
+    return version
+
+# Last search tree of the sessions served by this worker, for the tree endpoints, with the
+# session version it was played at; the least recently used ones are dropped beyond AI_MAX_SESSION_TREES
+session_trees = OrderedDict()
+session_trees_lock = threading.Lock()
+
+def keep_tree(session_id, mytree, version):
+    with session_trees_lock:
+        session_trees[session_id] = (mytree, version)
+        session_trees.move_to_end(session_id)
+        while len(session_trees) > AI_MAX_SESSION_TREES:
+            session_trees.popitem(last=False)
+
+# (tree, version) of the session, (None, None) when this worker has none
+def session_tree(session_id):
+    with session_trees_lock:
+        entry = session_trees.get(session_id, (None, None))
+        if entry[0] is not None:
+            session_trees.move_to_end(session_id)
+        return entry
+
+# Response of a polling endpoint for state `version` of a session. The payload is computed
+# once per version and worker, then served from response_cache; the ETag lets clients poll
+# with If-None-Match and get a 304 while nothing changed
+def versioned_response(request, endpoint, session_id, version, compute, variant=""):
+    etag = f'"{store.epoch}-{session_id}-{version}-{endpoint}{"-" + variant if variant else ""}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "X-Session-Id"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.count_not_modified(endpoint)
+        return Response(status_code=304, headers=headers)
+    key = (endpoint, session_id, variant)
+    body = response_cache.get(endpoint, key, etag)
+    if body is None:
+        body = JSONResponse(jsonable_encoder(compute())).body
+        response_cache.put(key, etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # Endpoint to start a new game
 @app.post("/start_game")
-def start_game(request: StartGameRequest):
-    global game
+def start_game(request: StartGameRequest, session_id: str = Depends(get_session_id)):
     player = request.player
     if player not in [1, -1]:
         raise HTTPException(status_code=400, detail="Invalid player selection")
     
     # Initialize the game
+    token = searches.get(session_id)
+    if token is not None:
+        token.cancel("reset")
+    drop_ponderers([session_id])
     game = ConnectN(**game_setting)
     game.player = player  # Set the current player based on choice
+    store.reset(session_id, game)
+    with session_trees_lock:
+        session_trees.pop(session_id, None)
+    purge_sessions()
     
     return {
         "status": "Game started",
         "board": game.state.tolist(),
-        "player": int(game.player)
+        "player": int(game.player),
+        "session_id": session_id
     }
 
 # Endpoint to make a move
 @app.post("/make_move")
-def make_move(move: Move):
-    global game
-    if game.score is not None:
+def make_move(move: Move, session_id: str = Depends(get_session_id)):
+    session, previous = apply_human_move(session_id, (move.row, move.col))
+    game = session.game
+    if previous is None:
         return {"status": "Game over", "winner": int(game.score)}
-    success = game.move((move.row, move.col))
-    if success:
+    winner = game.get_score()
+    return {
+        "status": "success",
+        "board": game.state.tolist(),
+        "player": int(game.player),
+        "winner": int(winner) if winner is not None else None
+    }
+
+# Play the human move in the session's game, returns the session and the game before the
+# move, None without a move when the game is already over. Blocks on the store and the
+# ponderer, so not for the event loop
+def apply_human_move(session_id, move):
+    with session_transaction(session_id) as session:
+        if session.game.score is not None:
+            return session, None
+        previous = copy(session.game)
+        if not session.game.move(move):
+            raise HTTPException(status_code=400, detail="Invalid move")
+        session.touch()
+    # the pondered subtree of this move is picked up by the next AI search
+    ponderer = session_ponderer(session_id)
+    if ponderer is not None:
+        ponderer.stop()
+    return session, previous
+
+# Take back the human move of a failed /play_turn: the game of the session goes back to
+# previous, unless another request changed it since `version`. True when it did
+def undo_human_move(session_id, version, previous):
+    with session_transaction(session_id) as session:
+        if session.version != version:
+            return False
+        session.game = previous
+        session.touch()
+    return True
+
+# Endpoint to get the current board
+@app.get("/get_board")
+def get_board(request: Request, board_format: str = "list", session_id: str = Depends(get_session_id)):
+    if board_format not in BOARD_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid board format")
+
+    def compute():
+        game = load_session(session_id).game
         winner = game.get_score()
         return {
-            "status": "success",
-            "board": game.state.tolist(),
+            "board": encode_board(game.state, board_format),
             "player": int(game.player),
             "winner": int(winner) if winner is not None else None
         }
-    else:
-        raise HTTPException(status_code=400, detail="Invalid move")
 
-# Endpoint to get the current board
-@app.get("/get_board")
-def get_board():
-    global game
+    return versioned_response(request, "get_board", session_id, session_version(session_id), compute, board_format)
+
+# Endpoint for the AI to make a move
+@app.get("/ai_move")
+async def ai_move(request: Request, session_id: str = Depends(get_session_id)):
+    # the store, the ponderer and the tree are only touched off the event loop
+    session = await run_in_threadpool(load_session, session_id)
+    if session.game.score is not None:
+        return {"status": "Game over", "winner": int(session.game.score)}
+    # Perform AI move on the search executor, with the budget the queue allows
+    with search_slot():
+        simulations = search_executor.budget(default_simulations())
+        move, mytree = await run_search(request, session_id, session.game, simulations)
+    result = await run_in_threadpool(apply_ai_move, session_id, session.version, move, mytree)
+    result["simulations"] = simulations
+    return result
+
+# Play the move of a search of the session's game at `version`,
+# unless another request changed the game during the search. Blocks on the store, the
+# ponderer and the tree budget, so not for the event loop
+def apply_ai_move(session_id, version, move, mytree, board_format="list"):
+    with session_transaction(session_id) as session:
+        if session.version != version:
+            raise HTTPException(status_code=409, detail="Game changed during search")
+        game = session.game
+        if not game.move(move):
+            raise HTTPException(status_code=400, detail="AI move failed")
+        session.touch()
     winner = game.get_score()
+    # search the position the human has to answer until they do, on its subtree moved out
+    # of the tree kept for the tree endpoints
+    if pondering and tuple(move) in mytree.child:
+        start_pondering(session_id, mytree.child[tuple(move)].detach_subtree())
+    # Save the last MCTS tree for visualization
+    keep_tree(session_id, mytree, session.version)
+    print(f"Last MCTS Tree Updated: {mytree}")  # Debug log
     return {
-        "board": game.state.tolist(),
+        "status": "success",
+        "move": [int(move[0]), int(move[1])],
+        "board": encode_board(game.state, board_format),
         "player": int(game.player),
         "winner": int(winner) if winner is not None else None
     }
+    
+# Endpoint for a full turn: the human move followed by the AI reply
+@app.post("/play_turn")
+async def play_turn(turn: TurnRequest, request: Request, session_id: str = Depends(get_session_id)):
+    """
+    Apply the human move, run the AI search and apply its reply in one call.
+    Replaces the /make_move, /ai_move, /ai_probability, /get_board sequence.
+    The value estimate is the one of the search root, so no extra policy pass is needed.
+    """
+    if turn.board_format not in BOARD_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid board format")
+    # admitted before the human move, so a rejected turn leaves the game unchanged
+    with search_slot():
+        session, previous = await run_in_threadpool(apply_human_move, session_id, (turn.row, turn.col))
+        game = session.game
+        if previous is None:
+            return {"status": "Game over", "winner": int(game.score)}
 
-# Endpoint for the AI to make a move
-@app.get("/ai_move")
-def ai_move():
-    global game, last_mytree
-    if game.score is not None:
-        return {"status": "Game over", "winner": int(game.score)}
-    # Perform AI move
-    move, mytree = Challenge_Player_MCTS(game)
-    success = game.move(move)
-    if success:
-        winner = game.get_score()
-        # Save the last MCTS tree for visualization
-        last_mytree = mytree
-        print(f"Last MCTS Tree Updated: {last_mytree}")  # Debug log
-        return {
+        result = {
             "status": "success",
-            "move": [int(move[0]), int(move[1])],
-            "board": game.state.tolist(),
+            "human_move": [turn.row, turn.col],
+            "ai_move": None,
+            "value": None,
+            "probability_of_winning": None,
+            "simulations": 0,
+            "board": encode_board(game.state, turn.board_format),
             "player": int(game.player),
-            "winner": int(winner) if winner is not None else None
+            "winner": int(game.score) if game.score is not None else None,
         }
-    else:
-        raise HTTPException(status_code=400, detail="AI move failed")
-    
+        if game.score is None:
+            simulations = search_executor.budget(default_simulations())
+            try:
+                move, mytree = await run_search(request, session_id, game, simulations)
+                reply = await run_in_threadpool(apply_ai_move, session_id, session.version, move, mytree,
+                                                turn.board_format)
+            except HTTPException as e:
+                # the turn fails as a whole, the client can send it again on the same board
+                if not await run_in_threadpool(undo_human_move, session_id, session.version, previous):
+                    raise
+                raise HTTPException(status_code=e.status_code, detail=f"{e.detail}, the human move was taken back")
+            # the root value is from the perspective of the human, who moved into it
+            value = -float(mytree.V)
+            result["ai_move"] = reply["move"]
+            result["value"] = value
+            result["probability_of_winning"] = (value + 1) / 2
+            result["simulations"] = simulations
+            result["board"] = reply["board"]
+            result["player"] = reply["player"]
+            result["winner"] = reply["winner"]
+    return result
+
 @app.get("/ai_probability")
-def ai_probability():
+def ai_probability(request: Request, session_id: str = Depends(get_session_id)):
     """
     Compute and return the AI's probability of winning at the current state.
+    The policy pass runs once per version of the game (see versioned_response).
     """
-    global game, challenge_policy
+    # cached per model too, a reload changes the answer
+    model = models.current
+    return versioned_response(request, "ai_probability", session_id, session_version(session_id),
+                              lambda: compute_ai_probability(load_session(session_id).game, model.policy),
+                              f"m{model.version}")
 
+def compute_ai_probability(game, policy):
     if game.score is not None:
         return {
             "status": "Game over",
@@ -138,7 +553,7 @@ def ai_probability():
 
     # Process the current game state with the AI policy
     frame = torch.tensor(game.state * AI_PLAYER, dtype=torch.float, device="cpu").unsqueeze(0).unsqueeze(0)
-    _, value = challenge_policy(frame)
+    _, value = policy(frame)
 
     # Transform value into a probability of AI winning
     probability_of_winning = ((value.item() + 1) / 2)  # Convert from [-1, 1] range to [0, 1]
@@ -149,32 +564,352 @@ def ai_probability():
     }
 
 # Function for the AI to select a move using MCTS
-def Challenge_Player_MCTS(game):
-    mytree = MCTS.Node(copy(game))
-    for _ in range(1000):
-        mytree.explore(challenge_policy)
-       
-    mytreenext, (v, nn_v, p, nn_p) = mytree.next(temperature=0.1)
-    
+# Root of a new search tree with the configured widening and memory cap
+def new_search_tree(game):
+    # without limits the budget only does the memory accounting
+    budget = MCTS.TreeBudget(max_nodes=AI_MAX_NODES, max_bytes=AI_MAX_TREE_BYTES)
+    return MCTS.Node(copy(game), widening=AI_WIDENING, budget=budget, autograd=False)
+
+# Root of the next AI search: the pondered subtree of the human's move if there is one
+def search_root(game, ponderer=None):
+    if ponderer is not None:
+        mytree = ponderer.take(game)
+        if mytree is not None:
+            return mytree
+    return new_search_tree(game)
+
+# The worker pool is only started on first use, worker processes import this module too
+root_parallel_search = None
+# concurrent searches would each start a pool
+root_parallel_lock = threading.Lock()
+
+def get_root_parallel_search():
+    global root_parallel_search
+    with root_parallel_lock:
+        if root_parallel_search is None:
+            root_parallel_search = RootParallelSearch(challenge_policy, workers=AI_WORKERS)
+        return root_parallel_search
+
+@app.on_event("shutdown")
+def stop_root_parallel_search():
+    if root_parallel_search is not None:
+        root_parallel_search.close()
+
+# After a reload the searches that are running finish on the old policy, new searches get
+# the new one; the pondered tree and the root-parallel workers of the old one are dropped
+def use_new_model(old, new):
+    global challenge_policy, root_parallel_search
+    challenge_policy = new.policy
+    if old is None:
+        return
+    drop_ponderers()
+    with root_parallel_lock:
+        retired, root_parallel_search = root_parallel_search, None
+    if retired is not None:
+        threading.Thread(target=retired.retire, daemon=True).start()
+
+models.on_swap(use_new_model)
+
+model_watch_stopping = threading.Event()
+
+# Follow the reloads requested on other workers
+def watch_model():
+    while not model_watch_stopping.wait(AI_MODEL_POLL_SECONDS):
+        try:
+            record = model_record()
+        except Exception as e:
+            print(f"Error reading the model record: {e}")  # Debug log
+            continue
+        if record is not None:
+            models.reload(record["path"], record["version"])
+
+@app.on_event("startup")
+def start_model_watch():
+    threading.Thread(target=watch_model, daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_model_watch():
+    model_watch_stopping.set()
+
+search_executor = SearchExecutor(AI_SEARCH_THREADS, AI_SEARCH_QUEUE, AI_MIN_BUDGET_FRACTION)
+
+@app.on_event("shutdown")
+def stop_search_executor():
+    search_executor.shutdown()
+
+# Place in the search executor for one AI search, 503 with Retry-After when the queue is full
+@contextmanager
+def search_slot():
+    try:
+        with search_executor.slot():
+            yield
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+# Cancellation token of the AI search running for every session on this worker,
+# cancelled by a newer search or a new game of the session
+searches = {}
+
+def begin_search(session_id):
+    token = CancelToken()
+    previous = searches.get(session_id)
+    searches[session_id] = token
+    if previous is not None:
+        previous.cancel("superseded")
+    return token
+
+def end_search(session_id, token):
+    if searches.get(session_id) is token:
+        del searches[session_id]
+
+# Run Challenge_Player_MCTS on the search executor, for a caller holding a search_slot.
+# A cancelled search (client disconnected, game reset, newer search) ends with a 409
+# and its simulations count as wasted
+async def run_search(request, session_id, game, simulations):
+    token = begin_search(session_id)
+
+    async def watch_disconnect():
+        # the body is already read, the next message is the disconnect (is_disconnected()
+        # does not see it through the http middlewares)
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+        token.cancel("disconnect")
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        return await search_executor.call(Challenge_Player_MCTS, game, simulations, token,
+                                          session_ponderer(session_id))
+    except SearchCancelled as e:
+        search_executor.record_cancel(e.reason, e.simulations)
+        raise HTTPException(status_code=409, detail=str(e))
+    finally:
+        watcher.cancel()
+        end_search(session_id, token)
+
+# Full simulation budget of an AI move with the configured search
+def default_simulations():
+    return GUMBEL_SIMULATIONS if AI_SEARCH == "gumbel" else AI_SIMULATIONS
+
+profiler = profiling.Profiler(AI_PROFILE_DIR)
+
+def Challenge_Player_MCTS(game, simulations=None, token=None, ponderer=None, progress=None):
+    # profiled when a capture is armed through /debug/profile
+    with profiler.search():
+        return run_ai_search(game, simulations, token, ponderer, progress)
+
+# token (a CancelToken) is checked between simulations, the search raises SearchCancelled once it is cancelled.
+# The PUCT search starts from the pondered subtree of ponderer, the Ponderer of the game's session.
+# progress(mytree, done), when given, is called with the search tree between simulations
+def run_ai_search(game, simulations=None, token=None, ponderer=None, progress=None):
+    start = time.perf_counter()
+    # the whole search runs on the policy current at its start, even if a reload swaps it
+    policy = challenge_policy
+    check = token.check if token is not None else None
+    if progress is not None:
+        def check(done):
+            if token is not None:
+                token.check(done)
+            progress(mytree, done)
+    if AI_SEARCH == "gumbel":
+        done = simulations or GUMBEL_SIMULATIONS
+        mytree = new_search_tree(game)
+        mytreenext, _ = MCTS.gumbel_search(mytree, policy, done, check=check)
+    else:
+        if AI_SEARCH == "root_parallel":
+            done = simulations or AI_SIMULATIONS
+            mytree = new_search_tree(game)
+            get_root_parallel_search().search(mytree, done, check=check)
+        else:
+            # pondered simulations count towards the budget
+            mytree = search_root(game, ponderer)
+            done = max(0, (simulations or AI_SIMULATIONS) - mytree.N)
+            for i in range(done):
+                if check is not None:
+                    check(i)
+                mytree.explore(policy)
+
+        mytreenext, (v, nn_v, p, nn_p) = mytree.next(temperature=0.1)
+
+    if instrumentation.enabled:
+        instrumentation.search_stats.add_search(done, time.perf_counter() - start)
     return mytreenext.game.last_move, mytree  # Now returns the move and MCTS root
 
+# Compact view of a search in progress, from the perspective of the AI (player to move)
+def search_snapshot(mytree, simulations):
+    w, h = mytree.game.size
+    visits = [0] * (w * h)
+    for (i, j), child in mytree.child.items():
+        visits[int(i) * h + int(j)] = int(child.N)
+    best_move = None
+    if mytree.child:
+        i, j = max(mytree.child.items(), key=lambda item: item[1].N)[0]
+        best_move = [int(i), int(j)]
+    value = -float(mytree.V)
+    return {
+        "simulations": simulations,
+        "visits": visits,
+        "best_move": best_move,
+        "value": value,
+        "probability_of_winning": (value + 1) / 2,
+    }
+
+# Done callback of a search that nobody waits for anymore
+def record_dropped_search(search):
+    error = None if search.cancelled() else search.exception()
+    if isinstance(error, SearchCancelled):
+        search_executor.record_cancel(error.reason, error.simulations)
+
+# WebSocket version of /ai_move that reports the search while it runs
+@app.websocket("/ws/ai_move")
+async def ws_ai_move(websocket: WebSocket, interval_ms: int = 100, simulations: Optional[int] = None,
+                     session_id: Optional[str] = None):
+    """
+    Start the AI search on the current game, with the search of /ai_move
+    (AI_SEARCH), and push a "progress" snapshot (see search_snapshot) every
+    interval_ms. The last message has type "final" and carries the same
+    payload as /ai_move. When the search queue is full, the only message is
+    an "error" with retry_after in seconds. simulations defaults to, and is
+    capped at, the budget of /ai_move.
+    The session is the X-Session-Id header or, for browsers that cannot set
+    it, the session_id query parameter.
+    """
+    await websocket.accept()
+    session_id = websocket.headers.get("x-session-id") or session_id or DEFAULT_SESSION
+    try:
+        if not valid_session_id(session_id):
+            raise HTTPException(status_code=400, detail="Invalid session id")
+        if interval_ms <= 0:
+            raise HTTPException(status_code=400, detail="interval_ms must be positive")
+        session = await run_in_threadpool(load_session, session_id)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close()
+        return
+    # a client cannot hold a search thread longer than an /ai_move search
+    simulations = max(1, min(simulations or default_simulations(), default_simulations()))
+    token = begin_search(session_id)
+    loop = asyncio.get_running_loop()
+    snapshots = asyncio.Queue()
+    last_snapshot = time.perf_counter()
+
+    def progress(mytree, done):
+        # on the search thread, which is the only one to change the tree
+        nonlocal last_snapshot
+        now = time.perf_counter()
+        if now - last_snapshot >= interval_ms / 1000:
+            last_snapshot = now
+            loop.call_soon_threadsafe(snapshots.put_nowait, search_snapshot(mytree, done))
+
+    async def watch_disconnect():
+        # the client sends nothing, the next message is the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        token.cancel("disconnect")
+
+    try:
+        game = session.game
+        if game.score is not None:
+            await websocket.send_json({"type": "final", "status": "Game over", "winner": int(game.score)})
+            await websocket.close()
+            return
+
+        try:
+            with search_executor.slot():
+                simulations = search_executor.budget(simulations)
+                search = asyncio.ensure_future(search_executor.call(
+                    Challenge_Player_MCTS, game, simulations, token, session_ponderer(session_id), progress))
+                watcher = asyncio.create_task(watch_disconnect())
+                try:
+                    while not search.done():
+                        snapshot = asyncio.ensure_future(snapshots.get())
+                        await asyncio.wait({search, snapshot}, return_when=asyncio.FIRST_COMPLETED)
+                        if snapshot.done():
+                            await websocket.send_json({"type": "progress", **snapshot.result()})
+                        else:
+                            snapshot.cancel()
+                except WebSocketDisconnect:
+                    token.cancel("disconnect")
+                    await asyncio.wait({search})
+                except asyncio.CancelledError:
+                    # the handler itself is cancelled, the search is counted once it stops
+                    token.cancel("disconnect")
+                    search.add_done_callback(record_dropped_search)
+                    raise
+                finally:
+                    watcher.cancel()
+                # the search of a client that went away stops at its next simulation and is dropped
+                disconnected = token.cancelled and token.reason == "disconnect"
+                try:
+                    move, mytree = search.result()
+                except SearchCancelled as e:
+                    search_executor.record_cancel(e.reason, e.simulations)
+                    if not disconnected:
+                        await websocket.send_json({"type": "error", "detail": str(e)})
+                        await websocket.close()
+                    return
+                if disconnected:
+                    return
+        except QueueFull as e:
+            await websocket.send_json({"type": "error", "detail": str(e), "retry_after": e.retry_after})
+            await websocket.close()
+            return
+
+        try:
+            # fails when the game changed during the search
+            result = await run_in_threadpool(apply_ai_move, session_id, session.version, move, mytree)
+        except HTTPException as e:
+            result = {"type": "error", "detail": e.detail}
+        await websocket.send_json({"type": "final", "simulations": simulations, **result})
+        await websocket.close()
+    except WebSocketDisconnect:
+        # the client went away before the final message
+        pass
+    finally:
+        end_search(session_id, token)
+
 # Endpoint to get MCTS tree data
 @app.get("/get_mcts_tree")
-def get_mcts_tree(max_depth: int = 3):
-    global last_mytree
+def get_mcts_tree(request: Request, max_depth: int = 3, session_id: str = Depends(get_session_id)):
+    # the tree of the last search, kept by the worker that ran it
+    last_mytree, version = session_tree(session_id)
     if last_mytree is None:
         print("No MCTS tree available")  # Debug log
         return {"tree": None}
     try:
-        tree_data = extract_mcts_tree_data(last_mytree, max_depth=max_depth)  # Limit depth to 3
-        return {"tree": tree_data}
+        # serialized once per search and depth
+        return versioned_response(request, "get_mcts_tree", session_id, version,
+                                  lambda: {"tree": extract_mcts_tree_data(last_mytree, max_depth=max_depth)},
+                                  f"d{max_depth}")
     except Exception as e:
         print(f"Error serializing MCTS tree: {e}")  # Debug log
         return {"tree": None}
     
+@app.get("/get_mcts_tree_flat")
+def get_mcts_tree_flat(max_depth: int = 3, format: str = "ndjson", gzip: bool = False, min_visits: int = 0,
+                       session_id: str = Depends(get_session_id)):
+    """
+    Stream the last MCTS tree breadth-first as flat records that reference
+    their parent by index. format is one of ndjson, columnar or binary
+    (see tree_export.NODE_DTYPE); gzip=true compresses the stream.
+    """
+    last_mytree, _ = session_tree(session_id)
+    if format not in tree_export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid tree format")
+    if last_mytree is None:
+        raise HTTPException(status_code=404, detail="No MCTS tree available")
+
+    chunks = tree_export.iter_export(last_mytree, format, max_depth=max_depth, min_visits=min_visits)
+    headers = {}
+    if format == "binary":
+        headers["X-Record-Size"] = str(tree_export.NODE_DTYPE.itemsize)
+    if gzip:
+        chunks = tree_export.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=tree_export.MEDIA_TYPES[format], headers=headers)
+
 @app.get("/get_mcts_subtree")
-def get_mcts_subtree(node_id: int, max_depth: int = 2):
-    global last_mytree
+def get_mcts_subtree(node_id: int, max_depth: int = 2, session_id: str = Depends(get_session_id)):
+    last_mytree, _ = session_tree(session_id)
     if last_mytree is None:
         print("No MCTS tree available")  # Debug log
         return {"tree": None}
@@ -189,12 +924,203 @@ def get_mcts_subtree(node_id: int, max_depth: int = 2):
         print(f"Error serializing MCTS subtree: {e}")  # Debug log
         return {"tree": None}
     
+# Search and endpoint metrics in the Prometheus text format
+@app.get("/metrics")
+def metrics():
+    trees = MCTS.tree_memory()
+    extra = [
+        ("mcts_live_trees", "gauge", "Search trees alive in the process", [("", trees["trees"])]),
+        ("mcts_live_tree_nodes", "gauge", "Nodes of the search trees alive in the process", [("", trees["nodes"])]),
+        ("mcts_live_tree_bytes", "gauge", "Estimated bytes of the search trees alive in the process", [("", trees["bytes"])]),
+        ("session_tree_bytes", "gauge", "Estimated bytes of the trees kept for the sessions by this worker", [("", session_memory()["bytes"])]),
+        ("session_trees", "gauge", "Sessions with a search tree kept by this worker", [("", len(session_trees))]),
+        ("sessions_stored", "gauge", "Sessions in the session store", [("", len(store))]),
+    ]
+    model = models.status()
+    extra += [
+        ("model_version", "gauge", "Version of the model used by new searches", [("", model["current"]["version"])]),
+        ("model_loaded_timestamp_seconds", "gauge", "When the current model was swapped in", [("", model["current"]["loaded_at"])]),
+        ("model_load_seconds", "gauge", "Time to load the current model", [("", model["current"]["load_seconds"])]),
+        ("model_warmup_seconds", "gauge", "Time to warm up the current model", [("", model["current"]["warmup_seconds"])]),
+        ("model_reload_in_progress", "gauge", "1 while a new model is loaded and warmed up", [("", int(model["loading"] is not None))]),
+        ("model_reloads_total", "counter", "Model reloads, by result",
+         [(f'result="{r}"', n) for r, n in sorted(model["reloads"].items())]),
+    ]
+    cache = response_cache.stats()
+    extra += [
+        ("response_cache_entries", "gauge", "Payloads of polling endpoints cached by this worker", [("", cache["entries"])]),
+        ("response_cache_bytes", "gauge", "Bytes of the cached payloads", [("", cache["bytes"])]),
+    ]
+    for name, key, help in (("response_cache_hits_total", "hits", "Polls answered from the cache"),
+                            ("response_cache_misses_total", "misses", "Polls that computed their payload"),
+                            ("response_not_modified_total", "not_modified", "Polls answered with 304 Not Modified")):
+        extra.append((name, "counter", help + ", by endpoint",
+                      [(f'endpoint="{e}"', n) for e, n in sorted(cache[key].items())]))
+    executor = search_executor.stats()
+    extra += [
+        ("search_executor_running", "gauge", "AI searches admitted and not waiting", [("", executor["pending"] - executor["waiting"])]),
+        ("search_executor_queue_depth", "gauge", "AI searches waiting for a search thread", [("", executor["waiting"])]),
+        ("search_executor_rejected_total", "counter", "AI searches rejected with a 503", [("", executor["rejected"])]),
+        ("search_executor_completed_total", "counter", "AI searches admitted by the search executor and finished", [("", executor["completed"])]),
+        ("search_executor_budget_fraction", "gauge", "Share of the simulation budget a new search would get", [("", executor["budget_fraction"])]),
+        ("search_cancelled_total", "counter", "AI searches cancelled before the end, by reason",
+         [(f'reason="{r}"', n) for r, n in sorted(executor["cancelled"].items())]),
+        ("search_wasted_simulations_total", "counter", "Simulations of cancelled AI searches, by reason",
+         [(f'reason="{r}"', n) for r, n in sorted(executor["wasted_simulations"].items())]),
+    ]
+    return PlainTextResponse(instrumentation.render(extra), media_type="text/plain; version=0.0.4")
+
 @app.get("/get_mcts_summary")
-def get_mcts_summary():
-    global last_mytree
+def get_mcts_summary(request: Request, session_id: str = Depends(get_session_id)):
+    last_mytree, version = session_tree(session_id)
     if last_mytree is None:
         return {"summary": None}
-    return {"summary": summarize_mcts_tree(last_mytree)}
+
+    # computed once per search, session_memory is as of that moment
+    def compute():
+        summary = summarize_mcts_tree(last_mytree)
+        summary["memory"] = last_mytree.budget.usage() if last_mytree.budget is not None else None
+        summary["session_memory"] = session_memory(session_id)
+        return {"summary": summary}
+
+    return versioned_response(request, "get_mcts_summary", session_id, version, compute)
+
+# Memory of the trees kept alive by this worker: the last AI search of the session
+# (of every session when None) and the pondered tree
+def session_memory(session_id=None):
+    with session_trees_lock:
+        trees = [tree for tree, _ in (session_trees.values() if session_id is None
+                                      else [session_trees.get(session_id, (None, None))])]
+    with session_ponderers_lock:
+        trees += [ponderer.tree for ponderer, _ in (session_ponderers.values() if session_id is None
+                                                     else [session_ponderers.get(session_id, (None, None))])
+                  if ponderer is not None]
+    budgets = []
+    for tree in trees:
+        if tree is not None and tree.budget is not None and tree.budget not in budgets:
+            budgets.append(tree.budget)
+    return {
+        "trees": len(budgets),
+        "nodes": sum(b.nodes for b in budgets),
+        "bytes": sum(b.bytes for b in budgets),
+    }
+
+class ReloadModelRequest(BaseModel):
+    path: str  # checkpoint on the server, loaded with policy.load_policy
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not AI_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, AI_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+# Load, warm up and swap in a new checkpoint on every worker, without a restart
+@app.post("/admin/reload_model", status_code=202, dependencies=[Depends(require_admin)])
+def admin_reload_model(request: ReloadModelRequest):
+    if not os.path.isfile(request.path):
+        raise HTTPException(status_code=400, detail="No such checkpoint")
+    record = model_record()
+    # a version that failed to load is not recorded, and not reused
+    last = models.status()["last_reload"]
+    version = max(record["version"] if record else 0, models.current.version, models.loading or 0,
+                  last["version"] if last else 0) + 1
+    models.reload(request.path, version, record_model)
+    return {"status": "loading", "version": version}
+
+# The model for the other workers, recorded once it serves on this one, so that a checkpoint
+# that fails to load is never picked up; skipped when a newer model was swapped in meanwhile
+def record_model(model):
+    if models.current is not model:
+        return
+    try:
+        store.set_meta("model", json.dumps({"path": model.path, "version": model.version}))
+    except Exception as e:
+        print(f"Error recording the model: {e}")  # Debug log
+
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+def admin_model():
+    return models.status()
+
+# The debug endpoints also need the admin token, see require_admin
+def require_debug_endpoints(x_admin_token: Optional[str] = Header(None)):
+    if not AI_DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    require_admin(x_admin_token)
+
+# Arm a profiler for the next AI searches (/ai_move, /play_turn), one capture at a time
+@app.post("/debug/profile", dependencies=[Depends(require_debug_endpoints)])
+def debug_profile(request: ProfileRequest):
+    try:
+        capture = profiler.arm(request.mode, request.searches, request.seconds, request.interval_ms / 1000)
+    except profiling.CaptureBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "armed", "capture": capture}
+
+@app.get("/debug/profile", dependencies=[Depends(require_debug_endpoints)])
+def debug_profile_status():
+    return {"capture": profiler.status()}
+
+# Result of the last capture: "pstats" or "text" (deterministic), "collapsed" (sampling)
+@app.get("/debug/profile/result", dependencies=[Depends(require_debug_endpoints)])
+def debug_profile_result(format: Optional[str] = None):
+    capture = profiler.status()
+    if capture is None:
+        raise HTTPException(status_code=404, detail="No profile captured")
+    if not capture["done"]:
+        raise HTTPException(status_code=409, detail="Profile capture still running")
+    if format is None:
+        format = "pstats" if capture["mode"] == "deterministic" else "collapsed"
+    try:
+        data = profiler.result(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "pstats":
+        return Response(content=data, media_type="application/octet-stream",
+                        headers={"Content-Disposition": 'attachment; filename="ai_search.pstats"'})
+    return PlainTextResponse(data)
+
+# tracemalloc snapshot diff around one search of the current position, to check
+# the estimates of MCTS.node_bytes; the search result is thrown away. The search goes
+# through the search executor like the ones of /ai_move
+@app.get("/debug/memory_snapshot", dependencies=[Depends(require_debug_endpoints)])
+async def debug_memory_snapshot(simulations: int = AI_SIMULATIONS, top: int = 20,
+                                session_id: str = Depends(get_session_id)):
+    game = (await run_in_threadpool(load_session, session_id)).game
+    if game.score is not None:
+        raise HTTPException(status_code=400, detail="Game is over")
+    with search_slot():
+        return await search_executor.call(memory_snapshot, game, simulations, top)
+
+def memory_snapshot(game, simulations, top):
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        mytree = new_search_tree(game)
+        for _ in range(simulations):
+            mytree.explore(challenge_policy)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    stats = after.compare_to(before, "lineno")
+    return {
+        "simulations": simulations,
+        "estimated": mytree.budget.usage(),
+        "traced_bytes": sum(stat.size_diff for stat in stats),
+        "top": [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:top]
+        ],
+    }
         
 def extract_node_by_id(node, target_id, max_depth=2, current_depth=0, best_path_ids=None):
     if id(node) == target_id:
@@ -240,20 +1166,6 @@ def extract_mcts_tree_data(node, max_depth=2, current_depth=0, best_path_ids=Non
 
     return node_to_dict(node, current_depth)
 
-def get_best_path_ids(node):
-    # Recursively find the path with the highest cumulative N
-    path_ids = []
-
-    def recurse(node):
-        path_ids.append(id(node))
-        if node.child:
-            # Select child with the highest N
-            best_child = max(node.child.values(), key=lambda c: c.N)
-            recurse(best_child)
-
-    recurse(node)
-    return set(path_ids)
-
 def summarize_mcts_tree(node):
     def aggregate(node):
         total_nodes = 1
@@ -273,9 +1185,6 @@ def summarize_mcts_tree(node):
         "average_V": total_V / total_nodes,
     }
 
-# Initialize the last MCTS tree
-last_mytree = None
-
 # Run the app
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,120 @@
+# model_registry.py
+#
+# The policy of the AI, replaced at run time without restarting the server.
+# reload() loads a checkpoint and warms it up in a background thread, then
+# makes it current in a single assignment: a search reads the current model
+# once when it starts and finishes on it, the searches started after the
+# swap use the new one. Listeners are told about every swap, to drop what
+# was computed with the old weights.
+#
+# Models are numbered with a version given by the caller, so that the
+# workers of a server that reload the same checkpoint agree on it.
+
+import threading
+import time
+from collections import Counter
+
+
+class Model:
+
+    def __init__(self, policy, version, path, load_seconds=0.0, warmup_seconds=0.0):
+        self.policy = policy
+        self.version = version
+        self.path = path
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.loaded_at = time.time()
+
+    def info(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+        }
+
+
+class ModelRegistry:
+
+    def __init__(self, loader, warmup=None):
+        # loader(path) returns a policy, warmup(policy) runs it once before it becomes current
+        self.loader = loader
+        self.warmup = warmup
+        self.lock = threading.Lock()
+        self.current = None
+        # version being loaded, None when no reload runs
+        self.loading = None
+        self.thread = None
+        self.listeners = []
+        self.reloads = Counter()
+        self.last_reload = None
+
+    def on_swap(self, listener):
+        # listener(old, new) is called after every swap, old is None for the first model
+        self.listeners.append(listener)
+
+    def load(self, path, version):
+        # load the first model, in the calling thread
+        self._swap(self._prepare(path, version))
+        return self.current
+
+    def reload(self, path, version, on_success=None):
+        """
+        Load and warm up the checkpoint at path in a background thread, then
+        make it current as `version` and call on_success(model), if given,
+        in that thread. Returns False, without loading, when that version is
+        not newer than the current or loading one, or when it already failed
+        to load.
+        """
+        with self.lock:
+            if version <= max(self.current.version, self.loading or -1):
+                return False
+            last = self.last_reload
+            if last is not None and last['version'] == version and last['state'] == 'failed':
+                return False
+            self.loading = version
+            self.last_reload = {'version': version, 'path': path, 'state': 'loading',
+                                'started': time.time(), 'finished': None, 'error': None}
+            self.thread = threading.Thread(target=self._reload, args=(path, version, on_success), daemon=True)
+            self.thread.start()
+            return True
+
+    def _prepare(self, path, version):
+        start = time.perf_counter()
+        policy = self.loader(path)
+        loaded = time.perf_counter()
+        if self.warmup is not None:
+            self.warmup(policy)
+        return Model(policy, version, path, loaded - start, time.perf_counter() - loaded)
+
+    def _reload(self, path, version, on_success):
+        try:
+            model = self._prepare(path, version)
+        except Exception as e:
+            with self.lock:
+                self.loading = None
+                self.reloads['failure'] += 1
+                self.last_reload.update(state='failed', finished=time.time(), error=f'{type(e).__name__}: {e}')
+            return
+        self._swap(model)
+        with self.lock:
+            self.loading = None
+            self.reloads['success'] += 1
+            self.last_reload.update(state='done', finished=time.time())
+        if on_success is not None:
+            on_success(model)
+
+    def _swap(self, model):
+        old, self.current = self.current, model
+        for listener in self.listeners:
+            listener(old, model)
+
+    def status(self):
+        with self.lock:
+            return {
+                'current': self.current.info() if self.current is not None else None,
+                'loading': self.loading,
+                'last_reload': dict(self.last_reload) if self.last_reload is not None else None,
+                'reloads': dict(self.reloads),
+            }
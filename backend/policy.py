@@ -1,4 +1,5 @@
 # policy.py
+import sys
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -9,6 +10,7 @@ class Policy(nn.Module):
 
     def __init__(self, game):
         super(Policy, self).__init__()
+        w, h = game.size
 
         # input = 6x6 board
         # convert to 5x5x16
@@ -16,11 +18,12 @@ class Policy(nn.Module):
         # 5x5x16 to 3x3x32
         self.conv2 = nn.Conv2d(16, 32, kernel_size=3, stride=1, bias=False)
 
-        self.size=3*3*32
+        # the fully connected layers fix the board size the network plays on
+        self.size=(w-3)*(h-3)*32
         
         # the part for actions
         self.fc_action1 = nn.Linear(self.size, self.size//4)
-        self.fc_action2 = nn.Linear(self.size//4, 36)
+        self.fc_action2 = nn.Linear(self.size//4, w*h)
         
         # the part for the value function
         self.fc_value1 = nn.Linear(self.size, self.size//6)
@@ -36,12 +39,116 @@ class Policy(nn.Module):
         # action head
         a = self.fc_action2(F.leaky_relu(self.fc_action1(y)))
         
-        avail = (torch.abs(x.squeeze())!=1).type(torch.FloatTensor)
-        avail = avail.reshape(-1, 36)
-        maxa = torch.max(a)
-        exp = avail*torch.exp(a-maxa)
-        prob = exp/torch.sum(exp)
-        
         # value head
         value = self.tanh_value(self.fc_value2(F.leaky_relu( self.fc_value1(y) )))
-        return prob.view(6,6), value
+        return masked_softmax(x, a), value
+
+
+class ConvPolicy(nn.Module):
+    """
+    Fully convolutional network that plays on any board size: a trunk of 3x3
+    convolutions with padding, a 1x1 convolution policy head with one logit
+    per cell, and a value head on the global average of the trunk features.
+    One set of weights can be used (and fine-tuned) for 6x6, 8x8, 9x9...
+    """
+
+    def __init__(self, game=None, channels=32, blocks=3):
+        super(ConvPolicy, self).__init__()
+        self.channels = channels
+
+        self.conv_in = nn.Conv2d(1, channels, kernel_size=3, padding=1)
+        self.blocks = nn.ModuleList([ nn.Conv2d(channels, channels, kernel_size=3, padding=1)
+                                      for _ in range(blocks) ])
+
+        # the part for actions
+        self.conv_action1 = nn.Conv2d(channels, channels//2, kernel_size=1)
+        self.conv_action2 = nn.Conv2d(channels//2, 1, kernel_size=1)
+
+        # the part for the value function
+        self.fc_value1 = nn.Linear(channels, channels)
+        self.fc_value2 = nn.Linear(channels, 1)
+        self.tanh_value = nn.Tanh()
+
+    def forward(self, x):
+
+        y = F.leaky_relu(self.conv_in(x))
+        for conv in self.blocks:
+            y = F.leaky_relu(conv(y)) + y
+
+        # action head
+        a = self.conv_action2(F.leaky_relu(self.conv_action1(y)))
+        a = a.reshape(x.shape[0], -1)
+
+        # value head
+        pooled = y.mean(dim=(2, 3))
+        value = self.tanh_value(self.fc_value2(F.leaky_relu( self.fc_value1(pooled) )))
+        return masked_softmax(x, a), value
+
+
+def masked_softmax(x, a):
+    # softmax of the (B, w*h) logits a over the empty cells of the boards x,
+    # normalized for every board of the batch on its own;
+    # a single board keeps the historical (w,h) output shape
+    w, h = x.shape[-2], x.shape[-1]
+    avail = (torch.abs(x)!=1).type(torch.FloatTensor)
+    avail = avail.reshape(-1, w*h)
+    maxa = torch.max(a, dim=1, keepdim=True)[0]
+    exp = avail*torch.exp(a-maxa)
+    prob = exp/torch.sum(exp, dim=1, keepdim=True)
+    if x.shape[0] == 1:
+        return prob.view(w,h)
+    return prob.view(-1,w,h)
+
+
+def limit_worker_threads():
+    # in worker processes, one per core (self-play, root-parallel search), torch
+    # would start a thread pool of all the cores in each of them
+    torch.set_num_threads(1)
+
+
+# networks selectable with train.py --arch
+ARCHITECTURES = {'policy': Policy, 'conv': ConvPolicy}
+
+
+def make_policy(arch, game, **kwargs):
+    if arch not in ARCHITECTURES:
+        raise ValueError(f'Unknown policy architecture {arch!r}, expected one of {sorted(ARCHITECTURES)}')
+    return ARCHITECTURES[arch](game, **kwargs)
+
+
+def policy_from_state_dict(state_dict, game):
+    # rebuild the network a bare state_dict (e.g. train.py weights.pt) belongs to
+    if 'conv_in.weight' in state_dict:
+        channels = state_dict['conv_in.weight'].shape[0]
+        blocks = len([ k for k in state_dict if k.startswith('blocks.') and k.endswith('.weight') ])
+        policy = ConvPolicy(game, channels=channels, blocks=blocks)
+    else:
+        policy = Policy(game)
+    policy.load_state_dict(state_dict)
+    return policy
+
+
+def load_policy(path, game=None):
+    """
+    Load a saved network: a whole pickled module (.policy files) or a bare
+    state_dict. game (a ConnectN) gives the board size of a state_dict, 6x6
+    by default. Raises ValueError when the network cannot play on the board
+    size of game.
+    """
+    # .policy files are whole modules pickled from a notebook or main.py,
+    # where the class lived in __main__, so make sure it can be found there
+    main = sys.modules['__main__']
+    if not hasattr(main, 'Policy'):
+        main.Policy = Policy
+    policy = torch.load(path, map_location='cpu', weights_only=False)
+
+    if isinstance(policy, dict):
+        from ConnectN import ConnectN
+        policy = policy_from_state_dict(policy, game or ConnectN(size=(6,6), N=4))
+
+    if game is not None and not isinstance(policy, ConvPolicy):
+        w, h = game.size
+        # older pickles have no record of their board size, only of their layers
+        if policy.fc_action2.out_features != w*h or policy.size != (w-3)*(h-3)*32:
+            raise ValueError(f'{path} was trained on another board size than {w}x{h}')
+    return policy
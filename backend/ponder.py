@@ -0,0 +1,125 @@
+# ponder.py
+#
+# Pondering: keep searching on the human's time. After the AI has moved,
+# its subtree (the position the human has to answer) is explored in a
+# background thread, which mostly deepens the likely human replies since
+# that is where PUCT sends the simulations. When the human's move comes in,
+# the thread is stopped and the subtree of that move becomes the root of the
+# next AI search, with its simulations already done.
+#
+# The work is bounded by max_simulations per position (and by the TreeBudget
+# of the tree, if it has one), and the thread pauses while the server handles
+# requests, see pause() / resume(). Ponderers that share a PauseGate pause
+# together, including the ones started while a pause is held.
+
+import threading
+
+import numpy as np
+
+
+class PauseGate:
+    """
+    Pause of a group of Ponderers: while a pause is held, none of them
+    starts a batch of simulations.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active = 0
+        # batches running
+        self.running = 0
+
+    def pause(self):
+        # returns once the running batches are done
+        with self.condition:
+            self.active += 1
+            while self.running:
+                self.condition.wait()
+
+    def resume(self):
+        with self.condition:
+            self.active -= 1
+
+    def enter(self):
+        # a batch may start, False while paused
+        with self.condition:
+            if self.active:
+                return False
+            self.running += 1
+            return True
+
+    def leave(self):
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+
+class Ponderer:
+
+    def __init__(self, policy, max_simulations=20000, batch=8, gate=None):
+        self.policy = policy
+        self.max_simulations = max_simulations
+        # simulations between two checks for a pause or a stop
+        self.batch = batch
+        self.tree = None
+        self.simulations = 0
+        self.thread = None
+        self.stopping = threading.Event()
+        self.gate = gate if gate is not None else PauseGate()
+
+    def start(self, tree):
+        # ponder on tree, the node of the position the human has to answer
+        self.stop()
+        self.tree = tree
+        self.simulations = 0
+        if tree.outcome is not None or tree.game.score is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        tree = self.tree
+        while not self.stopping.is_set() and self.simulations < self.max_simulations:
+            if not self.gate.enter():
+                self.stopping.wait(0.01)
+                continue
+            try:
+                for _ in range(self.batch):
+                    tree.explore(self.policy)
+                self.simulations += self.batch
+            finally:
+                self.gate.leave()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+    def take(self, game):
+        """
+        Stop pondering and return the pondered subtree for the position of
+        game, detached from its mother, or None when game is not one move
+        after the pondered position.
+        """
+        self.stop()
+        tree, self.tree = self.tree, None
+        if tree is None or game.last_move is None or tree.game.n_moves + 1 != game.n_moves:
+            return None
+        child = tree.child.get(tuple(game.last_move))
+        if child is None or child.game.player != game.player or not np.array_equal(child.game.state, game.state):
+            return None
+        child.detach_mother()
+        return child
+
+    def discard(self):
+        self.stop()
+        self.tree = None
+
+    def pause(self):
+        # called by request handlers, returns once the running batch is done
+        self.gate.pause()
+
+    def resume(self):
+        self.gate.resume()
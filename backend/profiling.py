@@ -0,0 +1,204 @@
+# profiling.py
+#
+# On-demand profiling of the AI searches of a running server. A capture is
+# armed for the next N searches or for a time window, and every search that
+# runs while it is armed is wrapped in Profiler.search():
+#
+#   deterministic  cProfile of the search thread, aggregated over the
+#                  searches; the result is a pstats file or a text report
+#   sampling       a background thread samples the stack of the search
+#                  threads every interval; the result is collapsed stacks
+#                  ("frame;frame;frame count" lines) for flamegraph tools
+#
+# Only one capture runs at a time, and a deterministic capture profiles one
+# search at a time (cProfile cannot profile concurrent searches together).
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+MODES = ('deterministic', 'sampling')
+
+
+class CaptureBusy(Exception):
+    pass
+
+
+class Capture:
+
+    def __init__(self, mode, searches=None, seconds=None, interval=0.005):
+        if mode not in MODES:
+            raise ValueError(f'Unknown profiling mode {mode!r}, expected one of {list(MODES)}')
+        if (searches is None) == (seconds is None):
+            raise ValueError('Give either a number of searches or a time window in seconds')
+        if (searches is not None and searches < 1) or (seconds is not None and seconds <= 0):
+            raise ValueError('The number of searches and the time window must be positive')
+        self.mode = mode
+        self.searches = searches
+        self.seconds = seconds
+        self.interval = interval
+        self.started = time.time()
+        self.finished = None
+        self.profiled = 0
+        self.profile = cProfile.Profile() if mode == 'deterministic' else None
+        self.stacks = Counter()
+        self.samples = 0
+
+    def expired(self):
+        if self.searches is not None:
+            return self.profiled >= self.searches
+        return time.time() >= self.started + self.seconds
+
+    def status(self):
+        return {
+            'mode': self.mode,
+            'searches': self.searches,
+            'seconds': self.seconds,
+            'profiled_searches': self.profiled,
+            'samples': self.samples,
+            'started': self.started,
+            'finished': self.finished,
+            'done': self.finished is not None,
+        }
+
+
+class Profiler:
+
+    def __init__(self, directory=None):
+        # finished captures are also written to directory, when set
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.capture = None
+        # threads running a profiled search, sampled in sampling mode
+        self.threads = set()
+        self.deterministic_busy = False
+        self.sampler = None
+
+    def arm(self, mode, searches=None, seconds=None, interval=0.005):
+        with self.lock:
+            self._finish_if_expired()
+            if self.capture is not None and self.capture.finished is None:
+                raise CaptureBusy('A profile capture is already running')
+            self.capture = Capture(mode, searches, seconds, interval)
+            if mode == 'sampling':
+                self.sampler = threading.Thread(target=self._sample, args=(self.capture,), daemon=True)
+                self.sampler.start()
+            return self.capture.status()
+
+    def status(self):
+        with self.lock:
+            self._finish_if_expired()
+            return self.capture.status() if self.capture is not None else None
+
+    @contextmanager
+    def search(self):
+        # wrap one AI search; profiles it when a capture is armed
+        capture = None
+        with self.lock:
+            self._finish_if_expired()
+            current = self.capture
+            if current is not None and current.finished is None:
+                if current.mode == 'sampling':
+                    capture = current
+                    self.threads.add(threading.get_ident())
+                elif not self.deterministic_busy:
+                    capture = current
+                    self.deterministic_busy = True
+                    capture.profile.enable()
+        try:
+            yield
+        finally:
+            if capture is not None:
+                if capture.mode == 'deterministic':
+                    capture.profile.disable()
+                with self.lock:
+                    if capture.mode == 'sampling':
+                        self.threads.discard(threading.get_ident())
+                    else:
+                        self.deterministic_busy = False
+                    capture.profiled += 1
+                    self._finish_if_expired()
+
+    def _finish_if_expired(self):
+        # called with the lock held; a time window ends only once its running searches are done
+        capture = self.capture
+        if capture is None or capture.finished is not None or not capture.expired():
+            return
+        if self.deterministic_busy or (capture.mode == 'sampling' and self.threads):
+            return
+        capture.finished = time.time()
+        self.threads.clear()
+        if self.directory:
+            self._store(capture)
+
+    def _sample(self, capture):
+        while True:
+            time.sleep(capture.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                if capture.finished is not None:
+                    return
+                for ident in self.threads:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        capture.stacks[collapse(frame)] += 1
+                        capture.samples += 1
+                self._finish_if_expired()
+
+    def result(self, fmt):
+        """
+        Result of the last finished capture: 'pstats' (bytes, loadable with
+        pstats.Stats) or 'text' for deterministic captures, 'collapsed'
+        for sampling ones. Returns None when there is no finished capture.
+        """
+        with self.lock:
+            self._finish_if_expired()
+            capture = self.capture
+        if capture is None or capture.finished is None:
+            return None
+        return render(capture, fmt)
+
+    def _store(self, capture):
+        os.makedirs(self.directory, exist_ok=True)
+        fmt = 'pstats' if capture.mode == 'deterministic' else 'collapsed'
+        name = time.strftime('profile-%Y%m%d-%H%M%S', time.localtime(capture.started)) + '.' + fmt
+        data = render(capture, fmt)
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(data if isinstance(data, bytes) else data.encode())
+
+
+def collapse(frame):
+    # "file:function;...;file:function" from the outermost frame down to frame
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def render(capture, fmt):
+    if capture.mode == 'sampling':
+        if fmt != 'collapsed':
+            raise ValueError('Sampling captures are only available as collapsed stacks')
+        return ''.join(f'{stack} {count}\n' for stack, count in capture.stacks.most_common())
+
+    if fmt not in ('pstats', 'text'):
+        raise ValueError('Deterministic captures are available as pstats or text')
+    if capture.profiled == 0:
+        # pstats refuses to load an empty profile
+        return marshal.dumps({}) if fmt == 'pstats' else 'No search was profiled\n'
+    if fmt == 'pstats':
+        stats = pstats.Stats(capture.profile)
+        return marshal.dumps(stats.stats)
+    if fmt == 'text':
+        out = io.StringIO()
+        pstats.Stats(capture.profile, stream=out).sort_stats('cumulative').print_stats(40)
+        return out.getvalue()
@@ -0,0 +1,143 @@
+# replay_buffer.py
+#
+# Fixed-capacity ring buffer of self-play records kept in memory-mapped
+# .npy files, so that several self-play processes can append to it, the
+# learner can sample from it, and its content survives a restart.
+#
+# One record is
+#   board:   int8 (w, h), from the perspective of the player to move
+#   visits:  float16 (w*h), MCTS visit distribution
+#   outcome: int8, final result from the perspective of the player to move
+#   full:    int8, 1 when visits come from a full search and are a policy
+#            target, 0 for the cheap moves of playout cap randomization
+#
+# Only one orientation of every position is stored; sample() applies one
+# of the board symmetries of MCTS.tlist on the fly.
+
+import fcntl
+import os
+import random
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+from numpy.lib.format import open_memmap
+
+import MCTS
+
+# layout of meta.npy
+CAPACITY, WIDTH, HEIGHT, NEXT, COUNT, GAMES = range(6)
+
+
+class MemmapReplayBuffer:
+
+    def __init__(self, path, capacity=None, size=None):
+        # capacity and size of a new buffer, 100000 and (6,6) by default; an existing
+        # buffer keeps its own, and a capacity or size given for it must match them
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.lock_file = open(os.path.join(path, 'lock'), 'a+')
+
+        with self.lock(exclusive=True):
+            meta_path = os.path.join(path, 'meta.npy')
+            if os.path.exists(meta_path):
+                self.meta = open_memmap(meta_path, mode='r+')
+                stored, w, h = (int(v) for v in self.meta[[CAPACITY, WIDTH, HEIGHT]])
+                if capacity is not None and capacity != stored:
+                    raise ValueError(f'Replay buffer {path} holds {stored} positions, not {capacity}')
+                if size is not None and tuple(size) != (w, h):
+                    raise ValueError(f'Replay buffer {path} is for {w}x{h} boards, not {size[0]}x{size[1]}')
+                capacity = stored
+                mode = 'r+'
+            else:
+                capacity = 100000 if capacity is None else capacity
+                w, h = (6, 6) if size is None else size
+                self.meta = open_memmap(meta_path, mode='w+', dtype=np.int64, shape=(6,))
+                self.meta[[CAPACITY, WIDTH, HEIGHT]] = capacity, w, h
+                mode = 'w+'
+
+            self.capacity = capacity
+            self.size = (w, h)
+            self.boards = open_memmap(os.path.join(path, 'boards.npy'), mode=mode, dtype=np.int8,
+                                      shape=(capacity, w, h))
+            self.visits = open_memmap(os.path.join(path, 'visits.npy'), mode=mode, dtype=np.float16,
+                                      shape=(capacity, w * h))
+            self.outcomes = open_memmap(os.path.join(path, 'outcomes.npy'), mode=mode, dtype=np.int8,
+                                        shape=(capacity,))
+            self.full = open_memmap(os.path.join(path, 'full.npy'), mode=mode, dtype=np.int8,
+                                    shape=(capacity,))
+            self.meta.flush()
+
+        # rotations are only symmetries of square boards
+        self.transformations = MCTS.tlist if w == h else MCTS.tlist_half
+
+    def __len__(self):
+        return int(self.meta[COUNT])
+
+    @property
+    def games(self):
+        # number of games appended since the buffer was created
+        return int(self.meta[GAMES])
+
+    @contextmanager
+    def lock(self, exclusive=False):
+        # advisory file lock shared by every process that opened the buffer
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def append_game(self, records):
+        """
+        Append the (board, p, z, full) records of one game, as returned by
+        train.self_play_game. The oldest records are overwritten when full.
+        """
+        n = len(records)
+        if n == 0:
+            return
+        boards, visits, outcomes, full = zip(*records)
+        with self.lock(exclusive=True):
+            start = int(self.meta[NEXT])
+            index = (start + np.arange(n)) % self.capacity
+            self.boards[index] = np.stack(boards)
+            self.visits[index] = np.stack(visits)
+            self.outcomes[index] = outcomes
+            self.full[index] = full
+            # publish the records only after they are written
+            self.meta[NEXT] = (start + n) % self.capacity
+            self.meta[COUNT] = min(self.capacity, int(self.meta[COUNT]) + n)
+            self.meta[GAMES] += 1
+
+    def sample(self, batch_size, augment=True):
+        """
+        Draw batch_size records uniformly, each under a random board symmetry.
+        Returns (boards, p, z, full) tensors shaped (B,1,w,h), (B,w*h), (B,) and (B,).
+        """
+        w, h = self.size
+        with self.lock():
+            index = np.random.randint(0, len(self), size=batch_size)
+            boards = np.array(self.boards[index])
+            visits = np.array(self.visits[index], dtype=np.float32).reshape(batch_size, w, h)
+            outcomes = np.array(self.outcomes[index], dtype=np.float32)
+            full = np.array(self.full[index], dtype=np.float32)
+
+        if augment:
+            for k in range(batch_size):
+                t = random.choice(self.transformations)
+                boards[k] = np.array(t(boards[k]))
+                visits[k] = np.array(t(visits[k]))
+
+        return (torch.tensor(boards, dtype=torch.float).unsqueeze(1),
+                torch.tensor(visits.reshape(batch_size, -1)),
+                torch.tensor(outcomes),
+                torch.tensor(full))
+
+    def minibatches(self, batch_size):
+        # as many random minibatches as the buffer holds records, for MinibatchTrainer
+        for _ in range(len(self) // batch_size):
+            yield self.sample(batch_size)
+
+    def flush(self):
+        for array in (self.boards, self.visits, self.outcomes, self.full, self.meta):
+            array.flush()
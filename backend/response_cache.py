@@ -0,0 +1,75 @@
+# response_cache.py
+#
+# Encoded payloads of the polling endpoints (/get_board, /ai_probability,
+# /get_mcts_summary, /get_mcts_tree), kept per worker under the ETag of the
+# state they were computed from. As long as the state version does not
+# change, a poll costs a dictionary lookup instead of a policy pass or a
+# tree walk, and a client that sends the ETag back in If-None-Match gets a
+# 304 without any body.
+#
+# The least recently used payloads are dropped beyond max_bytes.
+
+import threading
+from collections import Counter, OrderedDict
+
+
+class ResponseCache:
+
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> (etag, body)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = Counter()
+        self.misses = Counter()
+        self.not_modified = Counter()
+
+    def get(self, endpoint, key, etag):
+        # body cached for key under etag, None when missing or computed for another etag
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses[endpoint] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits[endpoint] += 1
+            return entry[1]
+
+    def put(self, key, etag, body):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            if len(body) > self.max_bytes:
+                return
+            self.entries[key] = (etag, body)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, (_, dropped) = self.entries.popitem(last=False)
+                self.bytes -= len(dropped)
+
+    def count_not_modified(self, endpoint):
+        with self.lock:
+            self.not_modified[endpoint] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'hits': dict(self.hits),
+                'misses': dict(self.misses),
+                'not_modified': dict(self.not_modified),
+            }
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match holds "*" or a comma separated list of (possibly weak) ETags
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
@@ -0,0 +1,141 @@
+# root_parallel.py
+#
+# Root-parallel MCTS: W independent searches of the same position, one in
+# the calling process and W-1 in worker processes, each with its own random
+# seed for the board symmetry of process_policy and for tie-breaking. The
+# visit counts and values of the root children are then merged into the
+# local tree, so next() picks the move from all W searches while the local
+# tree is still there for visualization.
+#
+#     search = RootParallelSearch(policy, workers=4)
+#     mytree = search.search(game, simulations=2000)
+#     mytreenext, _ = mytree.next(temperature=0.1)
+
+import multiprocessing as mp
+import random
+import threading
+from copy import copy
+from math import sqrt
+
+import numpy as np
+import torch
+
+import MCTS
+from policy import limit_worker_threads
+
+# the policy of the worker processes, set by init_worker
+worker_policy = None
+
+
+def init_worker(policy):
+    global worker_policy
+    limit_worker_threads()
+    worker_policy = policy
+
+
+def root_stats(root):
+    # {action: (N, V, U, prob)} of the root children, enough to merge searches
+    return { a: (c.N, float(c.V), float(c.U), float(c.prob)) for a, c in root.child.items() }
+
+
+def search_worker(game, simulations, seed, widening=None):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    root = MCTS.Node(game, widening=widening, autograd=False)
+    for _ in range(simulations):
+        root.explore(worker_policy)
+    return root_stats(root)
+
+
+def merge_root_stats(root, stats):
+    """
+    Add the root children statistics of other searches to root: visit counts
+    are summed, values averaged weighted by visits. A move proven won or lost
+    (U = +/-inf) in any search stays proven.
+    """
+    for other in stats:
+        for action, (N, V, U, prob) in other.items():
+            child = root.child.get(action)
+            if child is None:
+                # not expanded here because of progressive widening
+                pending = dict(root.pending)
+                if action not in pending:
+                    continue
+                root.pending = [ (a, p) for a, p in root.pending if a != action ]
+                child = root.add_child(action, pending[action])
+
+            if N > 0:
+                child.V = (child.N*child.V + N*V)/(child.N + N)
+                child.N += N
+                root.N += N
+            if U == float("inf") or U == -float("inf"):
+                child.U = U
+
+    # the root value and U of the children as the last backup would have left them
+    children = list(root.child.values())
+    visits = sum(c.N for c in children)
+    if visits > 0:
+        root.V = -sum(c.N*c.V for c in children)/visits
+    for child in children:
+        if child.U != float("inf") and child.U != -float("inf"):
+            child.U = child.V + MCTS.c*float(child.prob)*sqrt(root.N)/(1+child.N)
+    return root
+
+
+class RootParallelSearch:
+
+    def __init__(self, policy, workers=2, seed=None):
+        # workers is the total number of searches, the calling process runs one of them
+        self.policy = policy
+        self.workers = workers
+        self.seed = random.randrange(2**31) if seed is None else seed
+        self.searches = 0
+        # searches may run on several threads, each needs seeds of its own
+        self.lock = threading.Lock()
+        self.pool = None
+        if workers > 1:
+            # spawn, the server may hold threads that fork would not copy safely
+            ctx = mp.get_context('spawn')
+            self.pool = ctx.Pool(workers - 1, initializer=init_worker, initargs=(policy,))
+
+    def search(self, root, simulations, check=None):
+        """
+        Run simulations in total, split over the workers, from the position of
+        root (a fresh MCTS.Node) and return root with the merged statistics.
+        check, when given, is called with the number of local simulations done
+        before every one of them and may raise to abort; the shares already
+        sent to the workers still run to the end.
+        """
+        with self.lock:
+            self.searches += 1
+            search = self.searches
+        if self.pool is None:
+            for i in range(simulations):
+                if check is not None:
+                    check(i)
+                root.explore(self.policy)
+            return root
+
+        share = -(-simulations // self.workers)
+        seeds = [ self.seed + search*self.workers + k for k in range(1, self.workers) ]
+        pending = self.pool.starmap_async(search_worker,
+                                          [ (copy(root.game), share, s, root.widening) for s in seeds ])
+        for i in range(share):
+            if check is not None:
+                check(i)
+            root.explore(self.policy)
+        return merge_root_stats(root, pending.get())
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def retire(self):
+        # stop the workers once the shares already sent to them are done
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,147 @@
+# search_executor.py
+#
+# Dedicated executor for the AI searches, so that a burst of /ai_move calls
+# cannot take over Starlette's threadpool, which stays free for the cheap
+# endpoints (/get_board, /make_move, ...).
+#
+# At most `workers` searches run at once and at most `max_queue` more wait
+# for a worker. Beyond that a search is rejected right away (QueueFull, a
+# 503 with Retry-After in main.py) instead of queueing without bound. While
+# searches are waiting, new ones get a smaller simulation budget, down to
+# min_fraction of the full budget when the queue is full.
+#
+# Searches are cancelled cooperatively: the search loop calls
+# CancelToken.check between simulations, which raises SearchCancelled once
+# the token was cancelled (client gone, game reset, newer search). The
+# simulations done until then are counted as wasted, per reason.
+
+import asyncio
+import functools
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class QueueFull(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__(f'Search queue is full, retry in {retry_after} s')
+        self.retry_after = retry_after
+
+
+class SearchCancelled(Exception):
+
+    def __init__(self, reason, simulations):
+        super().__init__(f'Search cancelled ({reason}) after {simulations} simulations')
+        self.reason = reason
+        self.simulations = simulations
+
+
+class CancelToken:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason):
+        # the first reason is kept
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self, simulations):
+        # called between simulations with the number done so far
+        if self.event.is_set():
+            raise SearchCancelled(self.reason, simulations)
+
+
+class SearchExecutor:
+
+    def __init__(self, workers=2, max_queue=8, min_fraction=0.25):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.min_fraction = min_fraction
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search')
+        self.lock = threading.Lock()
+        # admitted searches, running or waiting for a worker
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.cancelled = Counter()
+        self.wasted_simulations = Counter()
+        # moving average of the search duration, for Retry-After
+        self.average_seconds = 1.0
+
+    def waiting(self):
+        return max(0, self.pending - self.workers)
+
+    def budget_fraction(self):
+        # 1 while a worker is free, down linearly with the queue depth to min_fraction
+        depth = min(1.0, self.waiting() / self.max_queue) if self.max_queue else 0.0
+        return 1 - (1 - self.min_fraction) * depth
+
+    def budget(self, simulations):
+        # simulations for a new search
+        return max(1, int(simulations * self.budget_fraction()))
+
+    def retry_after(self):
+        # seconds until the queue has drained by one search, at least 1
+        return max(1, math.ceil(self.average_seconds * (self.waiting() + 1) / self.workers))
+
+    @contextmanager
+    def slot(self):
+        # admission control: hold a place in the executor for one search, or raise QueueFull
+        with self.lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFull(self.retry_after())
+            self.pending += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.completed += 1
+
+    async def call(self, fn, *args):
+        # run fn(*args) on a search worker, for a caller that holds a slot
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.pool, functools.partial(fn, *args))
+        with self.lock:
+            self.average_seconds += 0.2 * (time.perf_counter() - start - self.average_seconds)
+        return result
+
+    async def run(self, fn, *args):
+        with self.slot():
+            return await self.call(fn, *args)
+
+    def record_cancel(self, reason, simulations):
+        with self.lock:
+            self.cancelled[reason] += 1
+            self.wasted_simulations[reason] += simulations
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self.pending,
+                'waiting': self.waiting(),
+                'budget_fraction': self.budget_fraction(),
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'cancelled': dict(self.cancelled),
+                'wasted_simulations': dict(self.wasted_simulations),
+                'average_seconds': self.average_seconds,
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,209 @@
+# sessions.py
+#
+# Game sessions, shared by all the uvicorn workers of the server so that any
+# worker can serve the board and the moves of any session:
+#
+#   memory   a dict in the process, for a single worker (the default)
+#   sqlite   a SQLite database in WAL mode, shared by the workers of one host
+#
+# A session holds the game and its version, bumped on every change. Changes
+# go through transaction(), which serializes them per store; AI searches run
+# on a copy outside of any transaction and their move is only applied when
+# the version did not change in the meantime.
+#
+# The epoch of a store is random and set when the store is created, so that
+# versions (and the ETags built from them) of a new store never match the
+# ones of an earlier store, e.g. a memory store before a restart.
+#
+# Stores also hold a few server wide values (get_meta / set_meta), like the
+# model the workers should serve.
+#
+# Search trees are not stored here: they stay in the memory of the worker
+# that ran the search (see main.py), which needs sticky routing on the
+# X-Session-Id header for the tree endpoints.
+
+import pickle
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from copy import copy
+
+DEFAULT_SESSION = 'default'
+
+SESSION_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def valid_session_id(session_id):
+    return SESSION_ID.fullmatch(session_id) is not None
+
+
+def first_version():
+    # new sessions start from the clock, so that a session purged and started
+    # again does not go through the versions it had before
+    return time.time_ns() // 1000
+
+
+class Session:
+
+    def __init__(self, game, version=1):
+        self.game = game
+        self.version = version
+        self.changed = False
+
+    def touch(self):
+        # save the session, with a new version, at the end of the transaction
+        self.changed = True
+
+
+class MemorySessionStore:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # session id -> (game, version, last update)
+        self.sessions = {}
+        self.meta = {}
+        self.epoch = secrets.token_hex(4)
+
+    def get_meta(self, key):
+        with self.lock:
+            return self.meta.get(key)
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.meta[key] = value
+
+    def version(self, session_id):
+        # version of the session without copying its game, None for an unknown session
+        with self.lock:
+            entry = self.sessions.get(session_id)
+        return entry[1] if entry is not None else None
+
+    def get(self, session_id):
+        # copy of the session, None for an unknown session
+        with self.lock:
+            entry = self.sessions.get(session_id)
+        if entry is None:
+            return None
+        return Session(copy(entry[0]), entry[1])
+
+    @contextmanager
+    def transaction(self, session_id):
+        with self.lock:
+            session = self.get(session_id)
+            yield session
+            if session is not None and session.changed:
+                self.sessions[session_id] = (copy(session.game), session.version + 1, time.time())
+                session.version += 1
+
+    def reset(self, session_id, game):
+        # start a new game in the session, the version keeps growing
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            version = entry[1] + 1 if entry is not None else first_version()
+            self.sessions[session_id] = (copy(game), version, time.time())
+            return Session(copy(game), version)
+
+    def purge(self, max_age):
+        # drop the sessions not changed for max_age seconds
+        with self.lock:
+            cutoff = time.time() - max_age
+            for session_id in [s for s, entry in self.sessions.items() if entry[2] < cutoff]:
+                del self.sessions[session_id]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.sessions)
+
+
+class SQLiteSessionStore:
+
+    def __init__(self, path):
+        self.path = path
+        # one connection per thread, sqlite3 connections are not shared between threads
+        self.local = threading.local()
+        with self.connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                         '(id TEXT PRIMARY KEY, version INTEGER NOT NULL, game BLOB NOT NULL, updated REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            # the first worker to open the database sets the epoch, the others read it
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (secrets.token_hex(4),))
+            self.epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # autocommit mode, transactions are started explicitly
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get_meta(self, key):
+        row = self.connect().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_meta(self, key, value):
+        self.connect().execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def version(self, session_id):
+        row = self.connect().execute('SELECT version FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def get(self, session_id):
+        row = self.connect().execute('SELECT game, version FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        if row is None:
+            return None
+        return Session(pickle.loads(row[0]), row[1])
+
+    @contextmanager
+    def transaction(self, session_id):
+        conn = self.connect()
+        # take the write lock right away, so concurrent transactions queue instead of failing
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            session = self.get(session_id)
+            yield session
+            if session is not None and session.changed:
+                conn.execute('UPDATE sessions SET game = ?, version = ?, updated = ? WHERE id = ?',
+                             (pickle.dumps(session.game), session.version + 1, time.time(), session_id))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if session is not None and session.changed:
+            session.version += 1
+
+    def reset(self, session_id, game):
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT version FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            version = row[0] + 1 if row is not None else first_version()
+            conn.execute('INSERT OR REPLACE INTO sessions (id, version, game, updated) VALUES (?, ?, ?, ?)',
+                         (session_id, version, pickle.dumps(game), time.time()))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return Session(copy(game), version)
+
+    def purge(self, max_age):
+        self.connect().execute('DELETE FROM sessions WHERE updated < ?', (time.time() - max_age,))
+
+    def __len__(self):
+        return self.connect().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+
+def open_store(spec):
+    """
+    Session store from its AI_SESSION_STORE spec: "memory" or "sqlite:PATH".
+    """
+    if spec == 'memory':
+        return MemorySessionStore()
+    if spec.startswith('sqlite:') and len(spec) > len('sqlite:'):
+        return SQLiteSessionStore(spec[len('sqlite:'):])
+    raise ValueError(f'Unknown session store {spec!r}, expected "memory" or "sqlite:PATH"')
@@ -0,0 +1,252 @@
+# train.py
+#
+# Parallel AlphaZero training: N self-play worker processes play games with
+# the latest published Policy weights and append (board, visit distribution,
+# outcome) records to a memory-mapped replay buffer (replay_buffer.py). The
+# learner trains on minibatches sampled from it at the same time and
+# periodically publishes new weights for the workers. The buffer lives in
+# --workdir and is picked up again when training is restarted.
+#
+#     python train.py --workers 8 --hours 12 --out 6-6-4-new.policy
+#
+# Run it from the backend/ directory.
+
+import argparse
+import os
+import random
+import time
+from collections import deque
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+import torch.optim as optim
+
+import MCTS
+from ConnectN import ConnectN
+from policy import ARCHITECTURES, Policy, limit_worker_threads, load_policy, make_policy
+from replay_buffer import MemmapReplayBuffer
+
+game_setting = {'size': (6,6), 'N':4}
+
+
+def self_play_game(policy, game_setting, simulations=2000, cheap_simulations=None, full_fraction=1.0):
+    """
+    Play one game of the policy against itself, as in the training notebook.
+    Returns a list of (board, p, z, full) records, one per move:
+      board: int8 board from the perspective of the player to move
+      p:     float32 MCTS visit distribution over all w*h cells
+      z:     final outcome from the perspective of the player to move
+      full:  whether p comes from a full search and is a policy target
+
+    With cheap_simulations set, only a random full_fraction of the moves get
+    the full search budget (playout cap randomization). The other moves are
+    played after a cheap search; their p is left empty and they only serve
+    as value targets.
+    """
+    mytree = MCTS.Node(ConnectN(**game_setting), autograd=False)
+    w, h = mytree.game.size
+    boards, visits, players, fulls = [], [], [], []
+
+    while mytree.outcome is None:
+        full = cheap_simulations is None or random.random() < full_fraction
+        budget = simulations if full else cheap_simulations
+        # the subtree kept from the previous move counts towards the budget
+        for _ in range(budget):
+            mytree.explore(policy)
+            if mytree.N >= budget:
+                break
+
+        current_player = mytree.game.player
+        actions = list(mytree.child.keys())
+        boards.append((mytree.game.state * current_player).astype(np.int8))
+        players.append(current_player)
+        fulls.append(full)
+
+        mytree, (v, nn_v, p, nn_p) = mytree.next()
+        mytree.detach_mother()
+
+        grid = np.zeros(w * h, dtype=np.float32)
+        if full:
+            for (i, j), prob in zip(actions, p.tolist()):
+                grid[i * h + j] = prob
+        visits.append(grid)
+
+    outcome = mytree.outcome
+    return [(board, p, np.int8(outcome * player), full)
+            for board, p, player, full in zip(boards, visits, players, fulls)]
+
+
+def load_weights(policy, path):
+    policy.load_state_dict(torch.load(path, map_location='cpu'))
+
+
+def publish_weights(policy, path):
+    # write then rename, so that workers never read a half written file
+    tmp = path + '.tmp'
+    torch.save(policy.state_dict(), tmp)
+    os.replace(tmp, path)
+
+
+def self_play_worker(worker_id, weights_path, version, buffer_path, stop, settings):
+    limit_worker_threads()
+    random.seed(settings['seed'] + worker_id)
+    np.random.seed(settings['seed'] + worker_id)
+
+    policy = make_policy(settings['arch'], ConnectN(**settings['game_setting']))
+    buffer = MemmapReplayBuffer(buffer_path)
+    current = -1
+    while not stop.is_set():
+        if version.value != current:
+            current = version.value
+            load_weights(policy, weights_path)
+        with torch.no_grad():
+            game_records = self_play_game(policy, settings['game_setting'], settings['simulations'],
+                                          settings['cheap_simulations'], settings['full_fraction'])
+        buffer.append_game(game_records)
+
+
+class MinibatchTrainer:
+    # optimizer steps on minibatches drawn from a MemmapReplayBuffer, or any records with minibatches()
+
+    def __init__(self, policy, optimizer, records, batch_size):
+        self.policy = policy
+        self.optimizer = optimizer
+        self.records = records
+        self.batch_size = batch_size
+        self.batches = iter(())
+        self.samples = 0
+        self.seconds = 0.0
+
+    def ready(self):
+        return len(self.records) >= self.batch_size
+
+    def step(self):
+        # start a new shuffled pass (which picks up new games) when the last one is used up
+        start = time.perf_counter()
+        batch = next(self.batches, None)
+        if batch is None:
+            self.batches = self.records.minibatches(self.batch_size)
+            batch = next(self.batches)
+
+        loss = loss_function(self.policy, *batch)
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+
+        self.samples += len(batch[0])
+        self.seconds += time.perf_counter() - start
+        return loss.item()
+
+    def samples_per_second(self):
+        return self.samples / self.seconds if self.seconds else 0.0
+
+
+def loss_function(policy, boards, p, z, full=None):
+    # value error plus cross entropy between the MCTS visit distribution and the policy,
+    # the policy term only counts for the positions that had a full search
+    prob, v = policy(boards)
+    prob = prob.reshape(len(boards), -1)
+    logterm = torch.where(p > 0, p * torch.log(prob + 1e-12), torch.zeros_like(p))
+    policy_loss = -torch.sum(logterm, dim=1)
+    if full is None:
+        return torch.mean((v.view(-1) - z)**2 + policy_loss)
+    # averaged over the full-search positions only, so that the share of cheap searches
+    # does not scale the policy gradient down
+    return torch.mean((v.view(-1) - z)**2) + torch.sum(policy_loss * full) / full.sum().clamp(min=1)
+
+
+def train(args):
+    ctx = mp.get_context('spawn')
+    game_setting = {'size': tuple(args.size), 'N': args.n}
+    if args.init:
+        # the architecture of the initial network wins over --arch
+        policy = load_policy(args.init, ConnectN(**game_setting))
+        arch = next(name for name, cls in ARCHITECTURES.items() if isinstance(policy, cls))
+    else:
+        arch = args.arch
+        policy = make_policy(arch, ConnectN(**game_setting))
+    settings = {'game_setting': game_setting, 'simulations': args.simulations, 'seed': args.seed,
+                'cheap_simulations': args.cheap_simulations, 'full_fraction': args.full_fraction,
+                'arch': arch}
+
+    optimizer = optim.Adam(policy.parameters(), lr=args.lr, weight_decay=1.e-5)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    weights_path = os.path.join(args.workdir, 'weights.pt')
+    if args.resume and os.path.exists(weights_path):
+        load_weights(policy, weights_path)
+    publish_weights(policy, weights_path)
+
+    buffer_path = os.path.join(args.workdir, 'replay')
+    buffer = MemmapReplayBuffer(buffer_path, args.buffer_size, game_setting['size'])
+    games_before = buffer.games
+
+    version = ctx.Value('i', 0)
+    stop = ctx.Event()
+    workers = [ctx.Process(target=self_play_worker,
+                           args=(k, weights_path, version, buffer_path, stop, settings), daemon=True)
+               for k in range(args.workers)]
+    for w in workers:
+        w.start()
+
+    trainer = MinibatchTrainer(policy, optimizer, buffer, args.batch_size)
+    start = time.time()
+    games = steps = 0
+    losses = deque(maxlen=100)
+    try:
+        while time.time() - start < args.hours * 3600 and (not args.games or games < args.games):
+            # wait for the workers while there is nothing (new) to train on
+            games = buffer.games - games_before
+            if not trainer.ready() or steps >= games * args.steps_per_game:
+                time.sleep(0.5)
+                continue
+
+            losses.append(trainer.step())
+            steps += 1
+
+            if steps % args.publish_every == 0:
+                publish_weights(policy, weights_path)
+                version.value += 1
+
+            if steps % args.log_every == 0:
+                hours = (time.time() - start) / 3600
+                print("step: {:d}, games: {:d}, games/hour: {:.0f}, buffer: {:d}, samples/sec: {:.0f}, weights: v{:d}, mean loss: {:3.2f}".format(
+                    steps, games, games / hours, len(buffer), trainer.samples_per_second(), version.value, np.mean(losses)))
+    finally:
+        stop.set()
+        for w in workers:
+            w.join(timeout=5)
+            if w.is_alive():
+                w.terminate()
+        buffer.flush()
+
+    torch.save(policy, args.out)
+    print("saved {:s} after {:d} games and {:d} steps".format(args.out, games, steps))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parallel AlphaZero self-play training')
+    parser.add_argument('--workers', type=int, default=max(1, os.cpu_count() - 1))
+    parser.add_argument('--arch', choices=sorted(ARCHITECTURES), default='policy',
+                        help='network, "conv" plays on any board size')
+    parser.add_argument('--size', type=int, nargs=2, default=list(game_setting['size']), metavar=('W', 'H'))
+    parser.add_argument('--n', type=int, default=game_setting['N'], help='stones in a row to win')
+    parser.add_argument('--simulations', type=int, default=2000, help='MCTS simulations per move')
+    parser.add_argument('--cheap-simulations', type=int, help='enable playout cap randomization with this cheap budget')
+    parser.add_argument('--full-fraction', type=float, default=0.25, help='fraction of moves with the full budget')
+    parser.add_argument('--hours', type=float, default=1.0)
+    parser.add_argument('--games', type=int, default=0, help='stop after this many games (0: no limit)')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--buffer-size', type=int, default=100000,
+                        help='replay buffer capacity in positions, must match an existing buffer')
+    parser.add_argument('--steps-per-game', type=int, default=4, help='cap on optimizer steps per self-play game')
+    parser.add_argument('--lr', type=float, default=.005)
+    parser.add_argument('--publish-every', type=int, default=50, help='optimizer steps between weight updates')
+    parser.add_argument('--log-every', type=int, default=50)
+    parser.add_argument('--init', help='start from a saved .policy instead of random weights')
+    parser.add_argument('--workdir', default='training', help='weights and replay buffer directory')
+    parser.add_argument('--resume', action='store_true', help='continue from the weights in --workdir')
+    parser.add_argument('--out', default='6-6-4-trained.policy')
+    parser.add_argument('--seed', type=int, default=0)
+    train(parser.parse_args())
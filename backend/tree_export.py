@@ -0,0 +1,170 @@
+# tree_export.py
+#
+# Flat, breadth-first export of an MCTS tree.
+#
+# The nested dictionaries built by main.extract_mcts_tree_data are fine for a
+# couple of levels, but deeper trees quickly become megabytes of Python
+# objects that FastAPI has to encode in one go.  The helpers below walk the
+# tree breadth-first and emit one record per node, each pointing at its
+# parent by index, so that the response can be streamed (NDJSON / binary)
+# or sent as a handful of flat arrays (columnar) instead.
+
+import json
+import math
+import zlib
+from collections import deque
+
+import numpy as np
+
+# order of the fields in every exported record
+COLUMNS = ('id', 'parent', 'depth', 'action', 'N', 'V', 'U', 'prob', 'is_best_path')
+
+# fixed little-endian layout used by the binary encoding
+NODE_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('parent', '<i4'),
+    ('depth', '<u1'),
+    ('is_best_path', '<u1'),
+    ('action_row', '<i1'),
+    ('action_col', '<i1'),
+    ('N', '<i4'),
+    ('V', '<f4'),
+    ('U', '<f4'),
+    ('prob', '<f4'),
+])
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'columnar': 'application/json',
+    'binary': 'application/octet-stream',
+}
+
+# number of records packed together before a chunk is yielded
+CHUNK_SIZE = 1024
+
+
+def get_best_path_ids(node):
+    # follow the child with the highest N from the root down
+    path_ids = set()
+    while True:
+        path_ids.add(id(node))
+        if not node.child:
+            return path_ids
+        node = max(node.child.values(), key=lambda c: c.N)
+
+
+def to_float(value):
+    # torch scalars -> float, and inf/nan -> 0.0 so the output stays valid JSON
+    value = float(value)
+    if math.isinf(value) or math.isnan(value):
+        return 0.0
+    return value
+
+
+def iter_tree_bfs(root, max_depth=3, min_visits=0):
+    """
+    Walk the tree breadth-first down to max_depth (inclusive) and yield
+    (index, parent_index, depth, action, node) for every node.
+    The root has parent index -1 and action None.
+    Children with fewer than min_visits visits are skipped with their subtrees.
+    """
+    queue = deque([(-1, 0, None, root)])
+    index = 0
+    while queue:
+        parent, depth, action, node = queue.popleft()
+        yield index, parent, depth, action, node
+        if depth < max_depth:
+            for child_action, child in node.child.items():
+                if child.N >= min_visits:
+                    queue.append((index, depth + 1, child_action, child))
+        index += 1
+
+
+def node_record(index, parent, depth, action, node, best_path_ids):
+    return {
+        'id': id(node),
+        'index': index,
+        'parent': parent,
+        'depth': depth,
+        'action': None if action is None else [int(action[0]), int(action[1])],
+        'N': int(node.N),
+        'V': to_float(node.V),
+        'U': to_float(node.U),
+        'prob': to_float(node.prob),
+        'is_best_path': id(node) in best_path_ids,
+    }
+
+
+def iter_ndjson(root, max_depth=3, min_visits=0):
+    # one JSON object per line, parents always before their children
+    best_path_ids = get_best_path_ids(root)
+    lines = []
+    for index, parent, depth, action, node in iter_tree_bfs(root, max_depth, min_visits):
+        record = node_record(index, parent, depth, action, node, best_path_ids)
+        lines.append(json.dumps(record, separators=(',', ':')))
+        if len(lines) == CHUNK_SIZE:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def iter_binary(root, max_depth=3, min_visits=0):
+    # packed NODE_DTYPE records, root action is stored as (-1, -1)
+    best_path_ids = get_best_path_ids(root)
+    chunk = np.zeros(CHUNK_SIZE, dtype=NODE_DTYPE)
+    n = 0
+    for index, parent, depth, action, node in iter_tree_bfs(root, max_depth, min_visits):
+        row, col = (-1, -1) if action is None else action
+        chunk[n] = (id(node), parent, depth, id(node) in best_path_ids, row, col,
+                    node.N, to_float(node.V), to_float(node.U), to_float(node.prob))
+        n += 1
+        if n == CHUNK_SIZE:
+            yield chunk.tobytes()
+            n = 0
+    if n:
+        yield chunk[:n].tobytes()
+
+
+def to_columnar(root, max_depth=3, min_visits=0):
+    """
+    Export the tree as one array per field, e.g. columns['parent'][i] is the
+    index of the parent of node i.
+    """
+    best_path_ids = get_best_path_ids(root)
+    columns = {name: [] for name in COLUMNS}
+    for index, parent, depth, action, node in iter_tree_bfs(root, max_depth, min_visits):
+        record = node_record(index, parent, depth, action, node, best_path_ids)
+        for name in COLUMNS:
+            columns[name].append(record[name])
+    columns['size'] = len(columns['id'])
+    return columns
+
+
+def iter_columnar(root, max_depth=3, min_visits=0):
+    yield json.dumps(to_columnar(root, max_depth, min_visits), separators=(',', ':')).encode()
+
+
+def iter_export(root, fmt='ndjson', max_depth=3, min_visits=0):
+    if fmt == 'ndjson':
+        return iter_ndjson(root, max_depth, min_visits)
+    if fmt == 'columnar':
+        return iter_columnar(root, max_depth, min_visits)
+    if fmt == 'binary':
+        return iter_binary(root, max_depth, min_visits)
+    raise ValueError(f'Unknown tree export format {fmt!r}, expected one of {sorted(MEDIA_TYPES)}')
+
+
+def gzip_chunks(chunks, level=6):
+    # streaming gzip, so compressed output can be sent as it is produced
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def decode_binary(data):
+    # inverse of iter_binary, mainly for clients written in Python and the benchmarks
+    return np.frombuffer(data, dtype=NODE_DTYPE)